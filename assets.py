@@ -0,0 +1,106 @@
+import os
+import struct
+import hashlib
+import pygame
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Background asset pipeline for the visualizer.
+
+Layers are decoded and scaled in worker threads, and the scaled pixels are kept
+in a disk cache keyed by source file and target size, so later starts skip PNG
+decoding and scaling. Conversion to the display pixel format happens on the
+main thread once the display exists.
+'''
+
+CACHE_HEADER = struct.Struct("<4sIIB")
+CACHE_MAGIC = b"FCPA"
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "fuzzy-cartpole", "assets")
+
+
+def cache_file(cache_dir, path, size):
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_mtime_ns}|{stat.st_size}|{size}"
+    digest = hashlib.sha1(key.encode()).hexdigest()[:16]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f"{name}-{digest}.raw")
+
+
+def read_cached(path):
+    with open(path, "rb") as f:
+        magic, width, height, alpha = CACHE_HEADER.unpack(f.read(CACHE_HEADER.size))
+        if magic != CACHE_MAGIC:
+            return None
+        pixels = f.read()
+    fmt = "RGBA" if alpha else "RGB"
+    return pygame.image.frombytes(pixels, (width, height), fmt), bool(alpha)
+
+
+def write_cached(path, surface, alpha):
+    fmt = "RGBA" if alpha else "RGB"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CACHE_HEADER.pack(CACHE_MAGIC, surface.get_width(), surface.get_height(), int(alpha)))
+        f.write(pygame.image.tobytes(surface, fmt))
+    os.replace(tmp_path, path)
+
+
+def load_layer(path, size_fn, cache_dir=None, cache_key=None):
+    '''
+    Decode and scale one image. size_fn maps the original (w, h) to the target
+    size, or returns None to keep the original size. cache_key must capture
+    everything size_fn depends on besides the image itself (the window size).
+    Returns (surface, has_alpha), not yet converted to the display format.
+    '''
+    cached = None
+    if cache_dir is not None:
+        cached = cache_file(cache_dir, path, cache_key)
+        if os.path.exists(cached):
+            try:
+                result = read_cached(cached)
+                if result is not None:
+                    return result
+            except (OSError, ValueError, struct.error, pygame.error) as e:
+                print(f"Ignoring broken asset cache {cached}: {e}")
+
+    surface = pygame.image.load(path)
+    alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+    size = size_fn(surface.get_size())
+    if size is not None and size != surface.get_size():
+        surface = pygame.transform.scale(surface, size)
+
+    if cached is not None:
+        try:
+            write_cached(cached, surface, alpha)
+        except OSError as e:
+            print(f"Could not write asset cache: {e}")
+    return surface, alpha
+
+
+def load_layers(layers, cache_dir=None, cache_key=None, max_workers=None):
+    '''
+    layers : {name: (path, size_fn)}. Missing files give None.
+    Layers load in parallel threads; the results are converted to the display
+    format here, so this must run on the thread that owns the display.
+    '''
+    images = {name: None for name in layers}
+    present = {name: spec for name, spec in layers.items() if os.path.exists(spec[0])}
+    if not present:
+        return images
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(present)) as pool:
+        futures = {name: pool.submit(load_layer, path, size_fn, cache_dir, cache_key)
+                   for name, (path, size_fn) in present.items()}
+        loaded = {name: future.result() for name, future in futures.items()}
+
+    display_ready = pygame.display.get_surface() is not None
+    for name, (surface, alpha) in loaded.items():
+        if display_ready:
+            surface = surface.convert_alpha() if alpha else surface.convert()
+        images[name] = surface
+    return images
@@ -0,0 +1,318 @@
+import os
+import sys
+import json
+import time
+import inspect
+import hashlib
+import argparse
+import itertools
+import numpy as np
+
+from rollout import batched_rollout, FAILED
+from closed_loop import FusedClosedLoop
+
+'''
+Basin of attraction of the controller over a grid of initial states.
+
+The grid spans (theta, theta_dot, x, x_dot). Every level of refinement halves
+the spacing; the coarse level is evaluated completely, and on every finer level
+only the cells whose corners disagree (some recover, some fail) are subdivided
+and simulated. Points inside uniform cells take the label of the cell, so the
+map has the finest resolution at about the cost of its boundary.
+
+Each point is a closed-loop episode from batched_rollout. Results are appended
+batch by batch to a disk cache keyed by a hash of the controller tables, plant,
+rollout and grid parameters, so an interrupted run resumes where it stopped and
+a repeated run costs nothing.
+'''
+
+AXES = ("theta", "theta_dot", "x", "x_dot")
+''' Column of each axis in the state vector x_dot, x, w_dot, w'''
+STATE_COLUMNS = (3, 2, 1, 0)
+RECORD = np.dtype([("index", "<i8"), ("outcome", "i1"), ("steps", "<i4")])
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "fuzzy-cartpole", "basin")
+
+
+def controller_digest(controller):
+    ''' Hash of the compiled controller tables'''
+    digest = hashlib.sha1()
+    for key in sorted(controller.arrays):
+        array = np.ascontiguousarray(controller.arrays[key])
+        digest.update(f"{key}|{array.dtype.str}|{array.shape}".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def rollout_parameters(**kwargs):
+    '''
+    Every setting an episode depends on : the batched_rollout arguments with
+    their defaults filled in, plus the gravity FusedClosedLoop uses, so a
+    changed default gives a new cache key instead of stale results.
+    '''
+    params = {name: p.default for name, p in inspect.signature(batched_rollout).parameters.items()
+              if p.default is not inspect.Parameter.empty and name != "loop"}
+    params["g"] = inspect.signature(FusedClosedLoop).parameters["g"].default
+    params.update(kwargs)
+    params["dtype"] = np.dtype(params["dtype"]).str
+    return {name: params[name] for name in sorted(params)}
+
+
+class BasinCache:
+    '''
+    Outcome and step count per lattice point, appended to points.bin as fixed
+    size records. A record cut short by an interruption is cut off on load, so
+    later appends stay aligned.
+    '''
+    def __init__(self, path, spec):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            with open(meta_path, "w") as f:
+                json.dump(spec, f, indent=2)
+
+        self.points_path = os.path.join(path, "points.bin")
+        records = np.zeros(0, dtype=RECORD)
+        if os.path.exists(self.points_path):
+            count = os.path.getsize(self.points_path) // RECORD.itemsize
+            with open(self.points_path, "r+b") as f:
+                f.truncate(count * RECORD.itemsize)
+            records = np.fromfile(self.points_path, dtype=RECORD, count=count)
+        self._set(records)
+
+    def _set(self, records):
+        records = records[np.argsort(records["index"], kind="stable")]
+        self.index = records["index"]
+        self.outcome = records["outcome"]
+        self.steps = records["steps"]
+
+    def __len__(self):
+        return len(self.index)
+
+    def lookup(self, indices):
+        ''' (outcome, steps, found) for flat lattice indices'''
+        if not len(self.index):
+            return np.zeros(len(indices), dtype=np.int8), np.zeros(len(indices), dtype=np.int32), np.zeros(len(indices), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.index, indices), len(self.index) - 1)
+        return self.outcome[pos], self.steps[pos], self.index[pos] == indices
+
+    def store(self, indices, outcome, steps):
+        records = np.zeros(len(indices), dtype=RECORD)
+        records["index"] = indices
+        records["outcome"] = outcome
+        records["steps"] = steps
+        with open(self.points_path, "ab") as f:
+            f.write(records.tobytes())
+        old = np.zeros(len(self.index), dtype=RECORD)
+        old["index"], old["outcome"], old["steps"] = self.index, self.outcome, self.steps
+        self._set(np.concatenate([old, records]))
+
+
+class BasinMapper:
+    '''
+    bounds : one (low, high) per axis of AXES; an axis with low == high is held fixed.
+    base : points per axis on the coarse level (int or one per axis).
+    levels : number of refinements, the finest spacing is the coarse one / 2**levels.
+    Episodes count as recovered unless they FAILED (settled, or still up at the
+    horizon). Remaining keyword arguments go to batched_rollout.
+    '''
+    def __init__(self, controller, bounds, base=9, levels=3, horizon=400, dt=0.05, target=0.0,
+                 batch_size=4096, cache_dir=None, **rollout_kwargs):
+        self.controller = controller
+        self.bounds = np.array(bounds, dtype=float).reshape(len(AXES), 2)
+        base = np.broadcast_to(np.asarray(base, dtype=np.int64), (len(AXES),)).copy()
+        base[self.bounds[:, 0] == self.bounds[:, 1]] = 1
+        if (base < 1).any():
+            raise ValueError("Every axis needs at least one point")
+        self.base = base
+        self.levels = levels
+        self.active = self.base > 1
+        self.horizon = horizon
+        self.dt = dt
+        self.target = target
+        self.batch_size = batch_size
+        self.rollout_kwargs = rollout_kwargs
+
+        self.spec = {
+            "controller": controller_digest(controller),
+            "bounds": self.bounds.tolist(),
+            "base": self.base.tolist(),
+            "levels": levels,
+            "horizon": horizon,
+            "rollout": rollout_parameters(dt=dt, target=target, **rollout_kwargs),
+        }
+        key = hashlib.sha1(json.dumps(self.spec, sort_keys=True).encode()).hexdigest()[:16]
+        self.cache = BasinCache(os.path.join(cache_dir or default_cache_dir(), key), self.spec)
+
+        ''' Points simulated / taken from the cache on every level'''
+        self.simulated = [0] * (levels + 1)
+        self.cached = [0] * (levels + 1)
+
+    def shape(self, level):
+        return tuple(int((b - 1) * 2 ** level + 1) if b > 1 else 1 for b in self.base)
+
+    def coordinates(self, level=None):
+        ''' Grid values along every axis'''
+        shape = self.shape(self.levels if level is None else level)
+        return [np.linspace(lo, hi, n) if n > 1 else np.array([lo]) for (lo, hi), n in zip(self.bounds, shape)]
+
+    def initial_states(self, points, level):
+        ''' Rows of the state vector for (M, 4) lattice points of `level`'''
+        states = np.zeros((len(points), 4))
+        for axis, values in enumerate(self.coordinates(level)):
+            states[:, STATE_COLUMNS[axis]] = values[points[:, axis]]
+        return states
+
+    def evaluate(self, points, level, progress=None):
+        ''' Outcome and steps of (M, 4) lattice points of `level`, simulating only uncached ones'''
+        stride = np.where(self.active, 2 ** (self.levels - level), 1)
+        flat = np.ravel_multi_index(tuple((points * stride).T), self.shape(self.levels))
+        outcome, steps, found = self.cache.lookup(flat)
+        outcome, steps = outcome.copy(), steps.copy()
+        self.cached[level] += int(found.sum())
+
+        missing = np.flatnonzero(~found)
+        for start in range(0, len(missing), self.batch_size):
+            rows = missing[start:start + self.batch_size]
+            result = batched_rollout(self.controller, self.initial_states(points[rows], level), self.horizon,
+                                     self.dt, target=self.target, **self.rollout_kwargs)
+            self.cache.store(flat[rows], result["outcome"], result["steps"])
+            outcome[rows] = result["outcome"]
+            steps[rows] = result["steps"]
+            self.simulated[level] += len(rows)
+            if progress is not None:
+                progress(level, start + len(rows), len(missing))
+        return outcome, steps
+
+    def mixed_cells(self, success):
+        ''' Lower corners of the cells whose corners are not all the same'''
+        axes = np.flatnonzero(self.active)
+        cell_shape = tuple(n - 1 if a else 1 for n, a in zip(success.shape, self.active))
+        first = success[tuple(slice(0, n) for n in cell_shape)]
+        mixed = np.zeros(cell_shape, dtype=bool)
+        for corner in itertools.product((0, 1), repeat=len(axes)):
+            offset = np.zeros(len(AXES), dtype=np.int64)
+            offset[axes] = corner
+            mixed |= success[tuple(slice(o, o + n) for o, n in zip(offset, cell_shape))] != first
+        return np.argwhere(mixed)
+
+    def run(self, progress=None):
+        '''
+        Returns a dict with the grid coordinates and dense finest level arrays :
+        outcome (filled from the cells), success, steps (-1 where not simulated)
+        and simulated (mask of points that were actually evaluated).
+        '''
+        shape = self.shape(0)
+        points = np.argwhere(np.ones(shape, dtype=bool))
+        outcome = np.zeros(shape, dtype=np.int8)
+        steps = np.full(shape, -1, dtype=np.int32)
+        values = self.evaluate(points, 0, progress)
+        outcome[tuple(points.T)], steps[tuple(points.T)] = values
+        evaluated = np.ones(shape, dtype=bool)
+
+        axes = np.flatnonzero(self.active)
+        offsets = np.array(list(itertools.product((0, 1, 2), repeat=len(axes))), dtype=np.int64).reshape(-1, len(axes))
+        for level in range(1, self.levels + 1):
+            cells = self.mixed_cells(outcome != FAILED)
+
+            ''' Upsample : new points take the label of their lower neighbour'''
+            for axis in axes:
+                index = np.arange(self.shape(level)[axis]) // 2
+                outcome = np.take(outcome, index, axis=axis)
+                steps = np.take(steps, index, axis=axis)
+                evaluated = np.take(evaluated, index, axis=axis)
+            odd = np.zeros(outcome.shape, dtype=bool)
+            for axis in axes:
+                view = [np.newaxis] * len(AXES)
+                view[axis] = slice(None)
+                odd |= (np.arange(outcome.shape[axis]) % 2 == 1)[tuple(view)]
+            steps[odd] = -1
+            evaluated[odd] = False
+
+            if not len(cells):
+                continue
+            points = np.repeat(cells * np.where(self.active, 2, 1), len(offsets), axis=0)
+            points[:, axes] += np.tile(offsets, (len(cells), 1))
+            points = np.unique(points, axis=0)
+            values = self.evaluate(points, level, progress)
+            outcome[tuple(points.T)], steps[tuple(points.T)] = values
+            evaluated[tuple(points.T)] = True
+
+        return {
+            "axes": AXES,
+            "coordinates": self.coordinates(),
+            "outcome": outcome,
+            "success": outcome != FAILED,
+            "steps": steps,
+            "simulated": evaluated,
+        }
+
+
+def plot_slice(result, x_axis, y_axis, path):
+    ''' Recovered / failed map over two axes, the others held at their middle value'''
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    i, j = AXES.index(x_axis), AXES.index(y_axis)
+    index = [n // 2 for n in result["success"].shape]
+    index[i] = index[j] = slice(None)
+    success = result["success"][tuple(index)]
+    if i < j:
+        success = success.T
+    coords = result["coordinates"]
+
+    fig, ax = plt.subplots(figsize=(6, 5))
+    ax.imshow(success, origin="lower", aspect="auto", cmap="RdYlGn", vmin=0, vmax=1,
+              extent=(coords[i][0], coords[i][-1], coords[j][0], coords[j][-1]))
+    ax.set_xlabel(x_axis)
+    ax.set_ylabel(y_axis)
+    ax.set_title("Basin of attraction")
+    fig.savefig(path, dpi=150, bbox_inches="tight")
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    from controller import build_fis
+
+    parser = argparse.ArgumentParser(description="Map the initial states the fuzzy controller recovers from")
+    defaults = {"theta": (-1.2, 1.2, 9), "theta_dot": (-3.0, 3.0, 9), "x": (0.0, 0.0, 1), "x_dot": (0.0, 0.0, 1)}
+    for axis, value in defaults.items():
+        parser.add_argument(f"--{axis.replace('_', '-')}", nargs=3, type=float, default=value, metavar=("LOW", "HIGH", "N"),
+                            help=f"Range and coarse points of {axis}; N=1 holds it at LOW")
+    parser.add_argument("--levels", type=int, default=3)
+    parser.add_argument("--horizon", type=int, default=400)
+    parser.add_argument("--dt", type=float, default=0.05)
+    parser.add_argument("--batch-size", type=int, default=4096)
+    parser.add_argument("--cache-dir", default=None)
+    parser.add_argument("--plot", default=None, help="Write a slice over the first two varied axes to this image")
+    args = parser.parse_args()
+
+    ranges = [getattr(args, axis) for axis in AXES]
+    mapper = BasinMapper(build_fis().compile(), [r[:2] for r in ranges], [int(r[2]) for r in ranges],
+                         args.levels, args.horizon, args.dt, batch_size=args.batch_size, cache_dir=args.cache_dir)
+
+    def progress(level, done, total):
+        print(f"\rlevel {level}: {done}/{total}", end="", file=sys.stderr)
+
+    start = time.perf_counter()
+    result = mapper.run(progress)
+    elapsed = time.perf_counter() - start
+    print(file=sys.stderr)
+
+    total = result["success"].size
+    for level in range(args.levels + 1):
+        print(f"level {level}  grid {'x'.join(map(str, mapper.shape(level)))}  "
+              f"simulated {mapper.simulated[level]}  cached {mapper.cached[level]}")
+    print(f"Recovered: {result['success'].mean():.1%} of {total} grid points  "
+          f"episodes: {sum(mapper.simulated) + sum(mapper.cached)} ({(sum(mapper.simulated) + sum(mapper.cached)) / total:.1%} of uniform)  "
+          f"in {elapsed:.2f}s")
+
+    if args.plot:
+        varied = [axis for axis, n in zip(AXES, result["success"].shape) if n > 1]
+        if len(varied) >= 2:
+            plot_slice(result, varied[0], varied[1], args.plot)
@@ -0,0 +1,31 @@
+import argparse
+import numpy as np
+
+from controller import build_fis
+from closed_loop import FusedClosedLoop
+
+
+def benchmark(num_envs, steps, warmup=5, seed=0):
+    controller = build_fis().compile()
+    loop = FusedClosedLoop(controller, num_envs)
+    rng = np.random.default_rng(seed)
+    loop.set_states(rng.uniform(-0.05, 0.05, size=(num_envs, 4)))
+
+    for _ in range(warmup):
+        loop.step()
+    loop.reset_counters()
+
+    for _ in range(steps):
+        loop.step()
+    return loop
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Closed-loop throughput of the fused controller + plant step")
+    parser.add_argument("--envs", type=int, nargs="+", default=[1, 64, 1024])
+    parser.add_argument("--steps", type=int, default=200)
+    args = parser.parse_args()
+
+    for n in args.envs:
+        loop = benchmark(n, args.steps)
+        print(f"envs={n:6d}  batch steps/s={loop.steps / loop.elapsed:10.1f}  env steps/s={loop.steps_per_second:12.1f}")
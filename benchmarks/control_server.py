@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+
+from control_client import AsyncControlClient
+from loop_timing import LatencyHistogram
+
+'''
+Load generator for the control server. Starts the server in its own process,
+then runs `clients` concurrent connections, each keeping `in_flight` single-row
+requests outstanding, and reports latency percentiles, throughput and the
+batch sizes the server formed. The server counters are reset before every
+concurrency level, so each line reports that level alone.
+'''
+
+
+async def client_load(path, duration, in_flight, histogram, seed):
+    client = await AsyncControlClient.connect(path)
+    rng = np.random.default_rng(seed)
+    stop_at = time.perf_counter() + duration
+    done = 0
+
+    async def worker():
+        nonlocal done
+        while time.perf_counter() < stop_at:
+            row = rng.uniform(-0.5, 0.5, size=4)
+            start = time.perf_counter_ns()
+            await client.compute_batch(row)
+            histogram.record(time.perf_counter_ns() - start)
+            done += 1
+
+    await asyncio.gather(*(worker() for _ in range(in_flight)))
+    await client.close()
+    return done
+
+
+async def run_load(path, clients, in_flight, duration):
+    control = await AsyncControlClient.connect(path)
+    await control.metrics(reset=True)
+    histogram = LatencyHistogram()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(client_load(path, duration, in_flight, histogram, i) for i in range(clients)))
+    elapsed = time.perf_counter() - start
+    metrics = await control.metrics()
+    await control.close()
+    return sum(results) / elapsed, histogram, metrics
+
+
+def start_server(path, batch_window_us):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen([sys.executable, "-m", "control_server", "--socket", path,
+                               "--batch-window-us", str(batch_window_us)], cwd=root, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while not os.path.exists(path):
+        if server.poll() is not None or time.time() > deadline:
+            raise RuntimeError("Control server did not start")
+        time.sleep(0.05)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput and latency of the micro-batching control server")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--in-flight", type=int, default=1, help="Outstanding requests per client")
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--batch-window-us", type=float, default=500.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "fuzzy.sock")
+    server = start_server(path, args.batch_window_us)
+    try:
+        for clients in args.clients:
+            rate, histogram, metrics = asyncio.run(run_load(path, clients, args.in_flight, args.duration))
+            print(f"{clients:4d} clients x {args.in_flight} in flight : {rate:10.0f} req/s   "
+                  f"p50 {histogram.percentile(50) / 1000:8.0f} us   p99 {histogram.percentile(99) / 1000:8.0f} us   "
+                  f"server mean batch {metrics['mean_batch_rows']:6.1f} rows, max queue {metrics['max_queue_depth']}")
+    finally:
+        server.terminate()
+        server.wait()
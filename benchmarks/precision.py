@@ -0,0 +1,103 @@
+import sys
+import math
+import argparse
+import numpy as np
+
+from controller import build_fis
+from closed_loop import FusedClosedLoop
+from cartpole import wrap_angle
+from rollout import batched_rollout
+
+'''
+How far float32 closed-loop runs drift from float64 ones.
+
+Every scenario is a batch of initial states and targets. Both precisions are
+stepped in lockstep to measure the state divergence while the pole is up, and
+run through batched_rollout to check that episodes still end the same way
+(fail / settle / time out) at about the same step.
+'''
+
+
+def standard_scenarios(n=256, seed=0):
+    rng = np.random.default_rng(seed)
+    scenarios = {}
+
+    states = np.zeros((n, 4))
+    states[:, 3] = np.linspace(-0.2, 0.2, n)
+    scenarios["small_angle"] = (states, 0.0)
+
+    states = np.zeros((n, 4))
+    states[:, 3] = np.concatenate([np.linspace(-1.2, -0.5, n // 2), np.linspace(0.5, 1.2, n - n // 2)])
+    scenarios["large_angle"] = (states, 0.0)
+
+    scenarios["target_step"] = (np.zeros((n, 4)), np.linspace(-2.0, 2.0, n))
+
+    states = rng.uniform(-1.0, 1.0, size=(n, 4)) * np.array([0.5, 1.0, 0.5, 0.3])
+    scenarios["random"] = (states, rng.uniform(-1.0, 1.0, size=n))
+    return scenarios
+
+
+def lockstep_divergence(controllers, init_states, target, horizon, dt, angle_tol, theta_limit=math.pi/2, x_limit=5.0):
+    ''' State error while both runs are still in bounds; after a fall the motion is chaotic and not compared'''
+    loops = [FusedClosedLoop(c, len(init_states), dt, dtype=c.dtype) for c in controllers]
+    for loop in loops:
+        loop.set_states(init_states)
+
+    max_error = np.zeros(4)
+    first_diverged = np.full(len(init_states), horizon, dtype=np.int64)
+    in_bounds = np.ones(len(init_states), dtype=bool)
+    for t in range(horizon):
+        reference, candidate = (loop.step(target).astype(np.float64) for loop in loops)
+        for states in (reference, candidate):
+            in_bounds &= (np.abs(states[:, 3]) <= theta_limit) & (np.abs(states[:, 1]) <= x_limit)
+        if not in_bounds.any():
+            break
+        error = np.abs(candidate - reference)[in_bounds]
+        error[:, 3] = np.abs(wrap_angle(candidate[in_bounds, 3] - reference[in_bounds, 3]))
+        np.maximum(max_error, error.max(axis=0), out=max_error)
+        newly = np.zeros_like(in_bounds)
+        newly[in_bounds] = error[:, 3] > angle_tol
+        first_diverged[newly & (first_diverged == horizon)] = t
+    return max_error, first_diverged
+
+
+def compare(scenarios, horizon=400, dt=0.05, angle_tol=1e-3):
+    fis = build_fis()
+    controllers = [fis.compile(dtype=np.float64), fis.compile(dtype=np.float32)]
+    report = {}
+    for name, (states, target) in scenarios.items():
+        max_error, first_diverged = lockstep_divergence(controllers, states, target, horizon, dt, angle_tol)
+        rollouts = [batched_rollout(c, states, horizon, dt, target=target, dtype=c.dtype) for c in controllers]
+        same_outcome = rollouts[0]["outcome"] == rollouts[1]["outcome"]
+        step_error = np.abs(rollouts[0]["steps"] - rollouts[1]["steps"])[same_outcome]
+        report[name] = {
+            "episodes": len(states),
+            "max_abs_error": max_error,
+            "diverged": int(np.count_nonzero(first_diverged < horizon)),
+            "median_divergence_time": float(np.median(first_diverged) * dt),
+            "outcome_mismatches": int(np.count_nonzero(~same_outcome)),
+            "max_step_error": int(step_error.max()) if step_error.size else 0,
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Divergence of float32 cart-pole runs from float64 over a standard scenario set")
+    parser.add_argument("--episodes", type=int, default=128)
+    parser.add_argument("--horizon", type=int, default=400)
+    parser.add_argument("--angle-tol", type=float, default=1e-3, help="Pole angle difference (rad) that counts as diverged")
+    parser.add_argument("--max-mismatch", type=float, default=0.05, help="Largest tolerated fraction of episodes ending differently")
+    args = parser.parse_args()
+
+    report = compare(standard_scenarios(args.episodes), args.horizon, angle_tol=args.angle_tol)
+    print(f"{'scenario':<13}{'x_dot':>10}{'x':>10}{'w_dot':>10}{'w':>10}{'diverged':>10}{'t_div s':>9}{'outcome':>9}{'steps':>7}")
+    failed = False
+    for name, r in report.items():
+        e = r["max_abs_error"]
+        print(f"{name:<13}{e[0]:>10.2e}{e[1]:>10.2e}{e[2]:>10.2e}{e[3]:>10.2e}"
+              f"{r['diverged']:>6}/{r['episodes']:<3}{r['median_divergence_time']:>9.2f}"
+              f"{r['outcome_mismatches']:>9}{r['max_step_error']:>7}")
+        failed |= r["outcome_mismatches"] > args.max_mismatch * r["episodes"]
+    if failed:
+        print("FAIL: float32 changes too many episode outcomes")
+    sys.exit(1 if failed else 0)
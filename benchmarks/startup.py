@@ -0,0 +1,70 @@
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+'''
+Startup cost of the fuzzy package: wall time of the import and peak resident
+memory, each measured in a fresh interpreter so nothing is already cached in
+sys.modules. Exits with status 1 when the medians go over budget, so it can
+run as a CI check.
+'''
+
+IMPORT = "from fuzzy.fuzzy import fuzzy"
+
+PROBE = r"""
+import sys, time, json, resource
+def rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+base_rss = rss_mb()
+start = time.perf_counter()
+exec(sys.argv[1])
+elapsed = time.perf_counter() - start
+heavy = sorted(m for m in ("matplotlib", "pygame", "scipy") if m in sys.modules)
+print(json.dumps({"import_ms": 1000.0 * elapsed, "rss_mb": rss_mb(), "base_rss_mb": base_rss, "heavy": heavy}))
+"""
+
+
+def measure(statement=IMPORT, cwd=None):
+    result = subprocess.run([sys.executable, "-c", PROBE, statement], capture_output=True, text=True, cwd=cwd, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def benchmark(statement=IMPORT, repeats=5, cwd=None):
+    runs = [measure(statement, cwd) for _ in range(repeats)]
+    return {
+        "import_ms": statistics.median(r["import_ms"] for r in runs),
+        "rss_mb": statistics.median(r["rss_mb"] for r in runs),
+        "base_rss_mb": statistics.median(r["base_rss_mb"] for r in runs),
+        "heavy": sorted(set(m for r in runs for m in r["heavy"])),
+    }
+
+
+if __name__ == "__main__":
+    import os
+    parser = argparse.ArgumentParser(description="Import time and memory budget for the fuzzy package")
+    parser.add_argument("--statement", default=IMPORT)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-import-ms", type=float, default=200.0)
+    parser.add_argument("--max-rss-mb", type=float, default=40.0)
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = benchmark(args.statement, args.repeats, cwd=root)
+    print(f"{args.statement}")
+    print(f"  import time  {result['import_ms']:8.1f} ms   (budget {args.max_import_ms:.0f} ms)")
+    print(f"  peak RSS     {result['rss_mb']:8.1f} MB   (budget {args.max_rss_mb:.0f} MB, interpreter alone {result['base_rss_mb']:.1f} MB)")
+
+    failures = []
+    if result["import_ms"] > args.max_import_ms:
+        failures.append("import time over budget")
+    if result["rss_mb"] > args.max_rss_mb:
+        failures.append("peak RSS over budget")
+    if result["heavy"]:
+        failures.append(f"optional modules loaded eagerly: {', '.join(result['heavy'])}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
@@ -1,14 +1,19 @@
 import math 
 import numpy as np
 
+def wrap_angle(theta):
+    ''' Wrap an angle (scalar or array) into [-pi, pi) '''
+    return (theta + math.pi) % (2 * math.pi) - math.pi
+
 class cartople:
-    def __init__(self, cart_mass, pole_mass, pole_length, firction=False, dimensions="2D"):
+    def __init__(self, cart_mass, pole_mass, pole_length, firction=False, dimensions="2D", dtype=float):
         self.cart_mass = cart_mass
         self.pole_mass = pole_mass
         self.pole_length = pole_length
         self.pole_half_length = pole_length / 2
         self.firction = firction
         self.dimensions = dimensions
+        self.dtype = dtype
         print("CartPole Initialized")
     
     def __call__(self, states,force, g = 9.8):
@@ -48,4 +53,32 @@ class cartople:
         # print(w_ddot)
         # print(w_dot)
 
-        return np.array([x_ddot,x_dot,w_ddot,w_dot],  dtype=float)
+        return np.array([x_ddot,x_dot,w_ddot,w_dot],  dtype=self.dtype)
+
+    def batch(self, states, force, g = 9.8, out=None):
+        ''' Vectorised __call__ : states is an (N, 4) array, force is (N,) or a scalar, the result has the dtype of states '''
+        x_dot = states[:, 0]
+        w_dot = states[:, 2]
+        w = states[:, 3]
+
+        s_theta = np.sin(w)
+        c_theta = np.cos(w)
+        total_mass = self.cart_mass + self.pole_mass
+
+        ''' Calculate w_ddot'''
+        inside_bracket = (- force - self.pole_mass * self.pole_half_length * w_dot * w_dot * s_theta) / total_mass
+        num = g * s_theta + c_theta * inside_bracket
+        deno = self.pole_half_length * (4/3 - (self.pole_mass * c_theta * c_theta) / total_mass)
+        w_ddot = num / deno
+
+        ''' Calculate x_ddot'''
+        inside_bracket = w_dot * w_dot * s_theta - w_ddot * c_theta
+        x_ddot = (force + self.pole_mass * self.pole_half_length * inside_bracket) / total_mass
+
+        if out is None:
+            out = np.empty_like(states)
+        out[:, 0] = x_ddot
+        out[:, 1] = x_dot
+        out[:, 2] = w_ddot
+        out[:, 3] = w_dot
+        return out
@@ -0,0 +1,243 @@
+import os
+import json
+import math
+import time
+import struct
+import argparse
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from fuzzy.compiled import CompiledFIS
+from simulation import CartPoleSimulation
+from scheduler import MultiRateScheduler
+
+'''
+Snapshots of a running simulation and deterministic replay.
+
+A snapshot holds everything the next physics step depends on : plant state and
+the previous state, controller output and target, simulated time and step
+counters, scheduler rates and accumulator, the compiled controller tables in
+use, and the input event log. Scratch buffers of the controller are rebuilt on
+restore, they do not carry state between calls.
+
+The event log records the slider target at the physics step of every control
+update that saw a new value. MultiRateScheduler.step depends only on the state
+and that target, so feeding the logged targets from a snapshot reproduces the
+live run bit for bit, headless and as fast as the machine allows. Swapping the
+controller while running (rule hot reload) is not an input event; replay from a
+snapshot taken after the swap.
+
+File layout : HEADER, STATE, JSON manifest of the controller tables, the table
+data in manifest order, then the events.
+'''
+
+SNAPSHOT_MAGIC = b"FCPS"
+SNAPSHOT_VERSION = 1
+HEADER = struct.Struct("<4sHIQ")
+STATE_FIELDS = ("force", "target", "time", "accumulator", "dropped_time",
+                "physics_hz", "control_hz", "cart_mass", "pole_mass", "pole_length", "g")
+''' states, previous states, STATE_FIELDS, physics steps, control steps'''
+STATE = struct.Struct(f"<4d4d{len(STATE_FIELDS)}d2q")
+EVENT = np.dtype([("step", "<i8"), ("target", "<f8")])
+
+
+class InputLog:
+    ''' Target seen by the controller, stored only when it changes'''
+    def __init__(self, events=None):
+        self.steps = []
+        self.targets = []
+        if events is not None:
+            self.steps = events["step"].tolist()
+            self.targets = events["target"].tolist()
+
+    def __len__(self):
+        return len(self.steps)
+
+    def record(self, step, target):
+        if not self.targets or self.targets[-1] != target:
+            self.steps.append(step)
+            self.targets.append(target)
+
+    def events(self):
+        events = np.zeros(len(self.steps), dtype=EVENT)
+        events["step"] = self.steps
+        events["target"] = self.targets
+        return events
+
+
+class Snapshot:
+    def __init__(self, states, previous_states, fields, physics_steps, control_steps, controller_arrays, events):
+        self.states = states
+        self.previous_states = previous_states
+        self.fields = fields
+        self.physics_steps = physics_steps
+        self.control_steps = control_steps
+        self.controller_arrays = controller_arrays
+        self.events = events
+
+    @classmethod
+    def capture(cls, scheduler):
+        ''' Copy of the scheduler and simulation state; call from the thread that steps them'''
+        sim = scheduler.simulation
+        fields = {
+            "force": sim.force, "target": sim.target, "time": sim.time,
+            "accumulator": scheduler.accumulator, "dropped_time": scheduler.dropped_time,
+            "physics_hz": scheduler.physics_hz, "control_hz": scheduler.control_hz,
+            "cart_mass": sim.cart_mass, "pole_mass": sim.pole_mass, "pole_length": sim.pole_length, "g": sim.g,
+        }
+        events = scheduler.input_log.events() if scheduler.input_log is not None else np.zeros(0, dtype=EVENT)
+        ''' Compiled tables are never modified in place (with_rules builds new ones), so no copy'''
+        return cls(sim.states.copy(), scheduler.previous_states.copy(), fields,
+                   sim.physics_steps, sim.control_steps, dict(sim.fis.arrays), events)
+
+    def save(self, path):
+        manifest = {key: [np.asarray(a).dtype.str, list(np.shape(a))] for key, a in sorted(self.controller_arrays.items())}
+        manifest = json.dumps(manifest).encode()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(manifest), len(self.events)))
+            f.write(STATE.pack(*self.states, *self.previous_states, *(float(self.fields[k]) for k in STATE_FIELDS),
+                               self.physics_steps, self.control_steps))
+            f.write(manifest)
+            for key in sorted(self.controller_arrays):
+                f.write(np.ascontiguousarray(self.controller_arrays[key]).tobytes())
+            f.write(np.ascontiguousarray(self.events, dtype=EVENT).tobytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, manifest_size, num_events = HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Not a version {SNAPSHOT_VERSION} snapshot: {path}")
+        offset = HEADER.size
+        values = STATE.unpack_from(data, offset)
+        offset += STATE.size
+        manifest = json.loads(data[offset:offset + manifest_size])
+        offset += manifest_size
+
+        arrays = {}
+        for key, (dtype, shape) in manifest.items():
+            dtype = np.dtype(dtype)
+            count = int(np.prod(shape, dtype=np.int64))
+            arrays[key] = np.frombuffer(data, dtype=dtype, count=count, offset=offset).reshape(shape).copy()
+            offset += count * dtype.itemsize
+        events = np.frombuffer(data, dtype=EVENT, count=num_events, offset=offset).copy()
+
+        n = len(STATE_FIELDS)
+        return cls(np.array(values[0:4]), np.array(values[4:8]), dict(zip(STATE_FIELDS, values[8:8 + n])),
+                   values[8 + n], values[9 + n], arrays, events)
+
+    def restore(self):
+        ''' New MultiRateScheduler and CartPoleSimulation in the captured state, with an InputLog holding the events'''
+        f = self.fields
+        sim = CartPoleSimulation(CompiledFIS(self.controller_arrays), f["cart_mass"], f["pole_mass"],
+                                 f["pole_length"], f["g"], states=self.states)
+        sim.force = f["force"]
+        sim.target = f["target"]
+        sim.time = f["time"]
+        sim.physics_steps = self.physics_steps
+        sim.control_steps = self.control_steps
+
+        scheduler = MultiRateScheduler(sim, f["physics_hz"], f["control_hz"])
+        scheduler.previous_states = self.previous_states.copy()
+        scheduler.accumulator = f["accumulator"]
+        scheduler.dropped_time = f["dropped_time"]
+        scheduler.input_log = InputLog(self.events)
+        return scheduler
+
+
+def replay(snapshot, events=None, until_step=None, stop=None, on_physics_step=None):
+    '''
+    Restore `snapshot` and step it headless with the logged targets.
+
+    events : event log to follow, by default the snapshot's own; pass the log of
+    a later snapshot to replay past the point this one was taken.
+    Runs to until_step (default : the last logged event), or until stop(sim)
+    returns True. Returns the scheduler; its simulation is in the replayed state.
+    '''
+    events = snapshot.events if events is None else events
+    scheduler = snapshot.restore()
+    scheduler.input_log = None
+    scheduler.on_physics_step = on_physics_step
+    sim = scheduler.simulation
+    if until_step is None:
+        until_step = int(events["step"][-1]) + 1 if len(events) else sim.physics_steps
+
+    steps = events["step"]
+    targets = events["target"]
+    ''' Next event to apply, and the target in effect at the snapshot'''
+    cursor = int(np.searchsorted(steps, sim.physics_steps, side="right"))
+    target = float(targets[cursor - 1]) if cursor else sim.target
+    while sim.physics_steps < until_step:
+        while cursor < len(steps) and steps[cursor] <= sim.physics_steps:
+            target = float(targets[cursor])
+            cursor += 1
+        scheduler.step(target)
+        if stop is not None and stop(sim):
+            break
+    return scheduler
+
+
+class SnapshotWriter:
+    ''' Periodic snapshots : captured on the simulation thread, written on a background thread'''
+    def __init__(self, directory, every_steps):
+        self.directory = directory
+        self.every_steps = max(1, int(every_steps))
+        self.pool = ThreadPoolExecutor(1, thread_name_prefix="snapshot-writer")
+
+    def on_physics_step(self, scheduler):
+        steps = scheduler.simulation.physics_steps
+        if steps % self.every_steps == 0:
+            snapshot = Snapshot.capture(scheduler)
+            self.pool.submit(snapshot.save, os.path.join(self.directory, f"step-{steps:010d}.snap"))
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a simulation snapshot headless with its recorded input")
+    parser.add_argument("snapshot", help="Snapshot to start from")
+    parser.add_argument("--events", default=None, help="Later snapshot whose input log is followed (e.g. last.snap)")
+    parser.add_argument("--until-step", type=int, default=None)
+    parser.add_argument("--until-time", type=float, default=None, help="Simulated time to stop at, in seconds")
+    parser.add_argument("--stop-on-fail", action="store_true", help="Stop when the pole falls past 90 degrees or the cart leaves the track")
+    parser.add_argument("--x-limit", type=float, default=5.0)
+    parser.add_argument("--save", default=None, help="Write a snapshot of the final state here")
+    args = parser.parse_args()
+
+    snapshot = Snapshot.load(args.snapshot)
+    events = None
+    until_step = args.until_step
+    if args.events:
+        later = Snapshot.load(args.events)
+        events = later.events
+        until_step = until_step if until_step is not None else later.physics_steps
+    if args.until_time is not None:
+        until_step = int(round(args.until_time * snapshot.fields["physics_hz"]))
+
+    stop = None
+    if args.stop_on_fail:
+        stop = lambda sim : abs(sim.states[3]) > math.pi / 2 or abs(sim.states[1]) > args.x_limit
+
+    start_step = snapshot.physics_steps
+    start = time.perf_counter()
+    scheduler = replay(snapshot, events, until_step, stop)
+    elapsed = time.perf_counter() - start
+    sim = scheduler.simulation
+
+    x_dot, x, w_dot, w = sim.states
+    replayed = sim.physics_steps - start_step
+    print(f"Replayed steps {start_step}..{sim.physics_steps} (t={sim.time:.2f}s) in {elapsed:.2f}s, "
+          f"{replayed / max(elapsed, 1e-9):.0f} steps/s")
+    print(f"x={x:.6f} x_dot={x_dot:.6f} theta={w:.6f} theta_dot={w_dot:.6f} force={sim.force:.6f} target={sim.target:.6f}")
+    if stop is not None and stop(sim):
+        print(f"Failed at step {sim.physics_steps} (t={sim.time:.2f}s)")
+    if args.save:
+        final = Snapshot.capture(scheduler)
+        events = snapshot.events if events is None else events
+        final.events = events[events["step"] < sim.physics_steps]
+        final.save(args.save)
@@ -0,0 +1,126 @@
+import math
+import time
+import numpy as np
+
+from cartpole import cartople
+from rk4 import rk4_inplace
+
+
+class FusedClosedLoop:
+    '''
+    Fuzzy controller and cart-pole dynamics stepped together for N environments.
+
+    The controller input vector [theta, theta_dot, target - x, x_dot] is written
+    straight from the (N, 4) state array into a reused input buffer, the compiled
+    FIS writes the force into a reused output buffer and the plant is integrated
+    in place. Only the first `n_active` rows are processed.
+
+    dtype sets the precision of the state, controller and integrator buffers;
+    use a controller compiled at the same precision.
+    '''
+    def __init__(self, controller, num_envs, dt=0.05, cart_mass=1, pole_mass=0.1, pole_length=1, g=9.8, dtype=np.float64):
+        self.controller = controller
+        self.num_envs = num_envs
+        self.n_active = num_envs
+        self.dt = dt
+        self.g = g
+        self.dtype = np.dtype(dtype)
+        self.plant = cartople(cart_mass, pole_mass, pole_length, dtype=self.dtype)
+
+        ''' states : x_dot, x, w_dot, w'''
+        self.states = np.zeros((num_envs, 4), dtype=self.dtype)
+        self.inputs = np.zeros((num_envs, 4), dtype=self.dtype)
+        self.outputs = np.zeros((num_envs, controller.numOut), dtype=self.dtype)
+
+        ''' Integrator and dynamics scratch'''
+        self.k = np.zeros((4, num_envs, 4), dtype=self.dtype)
+        self.y_tmp = np.zeros((num_envs, 4), dtype=self.dtype)
+        self.scratch = np.zeros((5, num_envs), dtype=self.dtype)
+
+        ''' Throughput counters'''
+        self.steps = 0
+        self.env_steps = 0
+        self.elapsed = 0.0
+
+    def set_states(self, states):
+        states = np.asarray(states, dtype=float)
+        self.n_active = states.shape[0]
+        self.states[:self.n_active] = states
+
+    def _derivatives(self, y, out):
+        n = y.shape[0]
+        s_theta, c_theta, a, b, force = self.scratch[:, :n]
+        force[:] = self.outputs[:n, 0]
+
+        x_dot = y[:, 0]
+        w_dot = y[:, 2]
+        w = y[:, 3]
+
+        p = self.plant
+        total_mass = p.cart_mass + p.pole_mass
+        ml = p.pole_mass * p.pole_half_length
+
+        np.sin(w, out=s_theta)
+        np.cos(w, out=c_theta)
+
+        ''' Calculate w_ddot : a = w_dot^2 * sin'''
+        np.multiply(w_dot, w_dot, out=a)
+        a *= s_theta
+        np.multiply(a, -ml, out=b)
+        b -= force
+        b *= c_theta / total_mass
+        np.multiply(s_theta, self.g, out=out[:, 2])
+        out[:, 2] += b
+        np.multiply(c_theta, c_theta, out=b)
+        b *= -p.pole_mass / total_mass
+        b += 4/3
+        b *= p.pole_half_length
+        out[:, 2] /= b
+
+        ''' Calculate x_ddot'''
+        np.multiply(out[:, 2], c_theta, out=b)
+        np.subtract(a, b, out=b)
+        b *= ml
+        b += force
+        np.divide(b, total_mass, out=out[:, 0])
+
+        out[:, 1] = x_dot
+        out[:, 3] = w_dot
+        return out
+
+    def step(self, target=0.0):
+        start = time.perf_counter()
+        n = self.n_active
+        states = self.states[:n]
+
+        inputs = self.inputs[:n]
+        inputs[:, 0] = states[:, 3]
+        inputs[:, 1] = states[:, 2]
+        np.subtract(target, states[:, 1], out=inputs[:, 2])
+        inputs[:, 3] = states[:, 0]
+
+        self.controller.compute_batch(inputs, out=self.outputs[:n])
+        rk4_inplace(self._derivatives, states, self.dt, self.k[:, :n], self.y_tmp[:n])
+
+        ''' Wrap the pole angle into [-pi, pi)'''
+        w = states[:, 3]
+        w += math.pi
+        np.mod(w, 2 * math.pi, out=w)
+        w -= math.pi
+
+        self.elapsed += time.perf_counter() - start
+        self.steps += 1
+        self.env_steps += n
+        return states
+
+    @property
+    def steps_per_second(self):
+        ''' Closed-loop environment steps per wall second'''
+        if self.elapsed == 0.0:
+            return 0.0
+        return self.env_steps / self.elapsed
+
+    def reset_counters(self):
+        self.steps = 0
+        self.env_steps = 0
+        self.elapsed = 0.0
@@ -0,0 +1,140 @@
+import json
+import socket
+import asyncio
+import itertools
+import numpy as np
+
+from control_server import FRAME, COMPUTE, ERROR, METRICS, FrameError, check_header, encode_frame, decode_payload, payload_size, read_frame
+
+
+class ControlServerError(RuntimeError):
+    pass
+
+
+def _result(kind, data):
+    if kind == ERROR:
+        raise ControlServerError(data.decode())
+    return data
+
+
+class ControlClient:
+    '''
+    Blocking client for ControlServer, one request in flight at a time.
+        with ControlClient(path="/tmp/fuzzy.sock") as client:
+            force = client.compute([theta, theta_dot, target - x, x_dot])[0]
+    '''
+    def __init__(self, path=None, host="127.0.0.1", port=7878, timeout=None):
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.ids = itertools.count(1)
+
+    def _recv_exactly(self, n):
+        buffer = bytearray(n)
+        view = memoryview(buffer)
+        while n:
+            received = self.sock.recv_into(view, n)
+            if received == 0:
+                raise ConnectionError("Control server closed the connection")
+            view = view[received:]
+            n -= received
+        return bytes(buffer)
+
+    def _request(self, frame):
+        self.sock.sendall(frame)
+        kind, request_id, rows, columns = FRAME.unpack(self._recv_exactly(FRAME.size))
+        check_header(kind, request_id, rows, columns)
+        body = self._recv_exactly(payload_size(kind, rows, columns))
+        return kind, decode_payload(kind, rows, columns, body)
+
+    def compute_batch(self, inputs):
+        ''' inputs : (N, numIn), returns (N, numOut)'''
+        inputs = np.atleast_2d(np.asarray(inputs, dtype=float))
+        return _result(*self._request(encode_frame(COMPUTE, next(self.ids), inputs)))
+
+    def compute(self, inputs:list):
+        ''' Same call as fuzzy.compute, returns a list of outputs'''
+        return self.compute_batch([inputs])[0].tolist()
+
+    def metrics(self, reset=False):
+        ''' Server counters; reset=True starts a new measurement period after this reply'''
+        payload = json.dumps({"reset": True}).encode() if reset else b""
+        return json.loads(_result(*self._request(encode_frame(METRICS, next(self.ids), payload=payload))))
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncControlClient:
+    '''
+    asyncio client; any number of requests may be in flight on one connection,
+    replies are matched to requests by id.
+    '''
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.pending = {}
+        self.ids = itertools.count(1)
+        self.receiver = None
+
+    @classmethod
+    async def connect(cls, path=None, host="127.0.0.1", port=7878):
+        client = cls()
+        if path is not None:
+            client.reader, client.writer = await asyncio.open_unix_connection(path)
+        else:
+            client.reader, client.writer = await asyncio.open_connection(host, port)
+            client.writer.get_extra_info("socket").setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client.receiver = asyncio.ensure_future(client.receive_loop())
+        return client
+
+    async def receive_loop(self):
+        try:
+            while True:
+                kind, request_id, data = await read_frame(self.reader)
+                future = self.pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if kind == ERROR:
+                    future.set_exception(ControlServerError(data.decode()))
+                else:
+                    future.set_result(data)
+        except (asyncio.IncompleteReadError, ConnectionError, FrameError) as e:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Control server connection lost: {e}"))
+            self.pending.clear()
+
+    async def _request(self, frame, request_id):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(frame)
+        return await future
+
+    async def compute_batch(self, inputs):
+        inputs = np.atleast_2d(np.asarray(inputs, dtype=float))
+        request_id = next(self.ids)
+        return await self._request(encode_frame(COMPUTE, request_id, inputs), request_id)
+
+    async def compute(self, inputs:list):
+        return (await self.compute_batch([inputs]))[0].tolist()
+
+    async def metrics(self, reset=False):
+        request_id = next(self.ids)
+        payload = json.dumps({"reset": True}).encode() if reset else b""
+        return json.loads(await self._request(encode_frame(METRICS, request_id, payload=payload), request_id))
+
+    async def close(self):
+        self.receiver.cancel()
+        self.writer.close()
+        await self.writer.wait_closed()
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import struct
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+'''
+Local fuzzy controller service.
+
+Clients connect over a Unix domain socket or TCP on localhost and send rows of
+controller inputs. Requests arriving within `batch_window` seconds of each
+other are stacked into one micro-batch for CompiledFIS.compute_batch, which
+runs on a single worker thread while the event loop keeps reading requests.
+
+Framing, both directions : header FRAME (kind, request id, rows, columns)
+followed by rows * columns little-endian float64 values, or a UTF-8 / JSON
+payload of `rows` bytes for ERROR and METRICS replies. Headers are checked
+before the body is read, so a bad header never makes the reader allocate more
+than MAX_ROWS_PER_REQUEST rows or MAX_TEXT_BYTES.
+'''
+
+FRAME = struct.Struct("<BIII")
+COMPUTE, RESULT, ERROR, METRICS, METRICS_REPLY = 1, 2, 3, 4, 5
+MAX_ROWS_PER_REQUEST = 1 << 20
+MAX_COLUMNS = 64
+MAX_TEXT_BYTES = 1 << 16
+
+
+class FrameError(ValueError):
+    ''' Header rejected before its body was read; the stream cannot be resynchronised after it'''
+    def __init__(self, request_id, message):
+        super().__init__(message)
+        self.request_id = request_id
+
+
+def encode_frame(kind, request_id, array=None, payload=None):
+    if payload is not None:
+        return FRAME.pack(kind, request_id, len(payload), 0) + payload
+    array = np.ascontiguousarray(array, dtype="<f8")
+    rows, columns = array.shape
+    return FRAME.pack(kind, request_id, rows, columns) + array.tobytes()
+
+
+def decode_payload(kind, rows, columns, body):
+    if kind in (ERROR, METRICS, METRICS_REPLY):
+        return body
+    return np.frombuffer(body, dtype="<f8").reshape(rows, columns)
+
+
+def payload_size(kind, rows, columns):
+    if kind in (ERROR, METRICS, METRICS_REPLY):
+        return rows
+    return rows * columns * 8
+
+
+def check_header(kind, request_id, rows, columns, num_inputs=None, max_rows=MAX_ROWS_PER_REQUEST):
+    ''' Raise FrameError unless the body announced by the header is of an expected kind and size'''
+    if kind in (ERROR, METRICS, METRICS_REPLY):
+        if rows > MAX_TEXT_BYTES:
+            raise FrameError(request_id, f"Text payload of {rows} bytes, at most {MAX_TEXT_BYTES}")
+    elif kind in (COMPUTE, RESULT):
+        if kind == COMPUTE and num_inputs is not None and columns != num_inputs:
+            raise FrameError(request_id, f"Number of Inputs:{columns} not equal to numIn variable:{num_inputs} ")
+        if columns > MAX_COLUMNS:
+            raise FrameError(request_id, f"{columns} columns, at most {MAX_COLUMNS}")
+        if rows > max_rows:
+            raise FrameError(request_id, f"At most {max_rows} rows per request")
+    else:
+        raise FrameError(request_id, f"Unknown request kind {kind}")
+
+
+async def read_frame(reader, num_inputs=None, max_rows=MAX_ROWS_PER_REQUEST):
+    kind, request_id, rows, columns = FRAME.unpack(await reader.readexactly(FRAME.size))
+    check_header(kind, request_id, rows, columns, num_inputs, max_rows)
+    body = await reader.readexactly(payload_size(kind, rows, columns))
+    return kind, request_id, decode_payload(kind, rows, columns, body)
+
+
+class ControlServer:
+    def __init__(self, controller, batch_window=0.0005, max_batch=4096):
+        self.controller = controller
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.queue = None
+        self.server = None
+        self.batcher = None
+        ''' compute_batch reuses its work buffers, so exactly one thread may run it'''
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.compute_time = 0.0
+        self.max_queue_depth = 0
+        self.connections = 0
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        ''' Listen on the Unix socket `path` if given, otherwise on host:port'''
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.ensure_future(self.batch_loop())
+        if path is not None:
+            if os.path.exists(path):
+                os.unlink(path)
+            self.server = await asyncio.start_unix_server(self.handle_client, path=path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host=host, port=port)
+        self.started = time.perf_counter()
+        return self.server
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher.cancel()
+        self.executor.shutdown()
+
+    async def handle_client(self, reader, writer):
+        self.connections += 1
+        pending = set()
+        try:
+            while True:
+                try:
+                    kind, request_id, data = await read_frame(reader, self.controller.numIn)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except FrameError as e:
+                    ''' The body was not read, so report and drop the connection'''
+                    self.errors += 1
+                    writer.write(encode_frame(ERROR, e.request_id, payload=str(e).encode()))
+                    await writer.drain()
+                    break
+                if kind == COMPUTE:
+                    task = asyncio.ensure_future(self.answer(writer, request_id, data))
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                elif kind == METRICS:
+                    ''' An optional JSON body {"reset": true} starts a new measurement period after the reply'''
+                    try:
+                        reset = bool(data) and json.loads(data).get("reset")
+                    except (ValueError, AttributeError):
+                        self.errors += 1
+                        writer.write(encode_frame(ERROR, request_id, payload=b"METRICS body must be a JSON object"))
+                        continue
+                    reply = json.dumps(self.metrics()).encode()
+                    if reset:
+                        self.reset_metrics()
+                    writer.write(encode_frame(METRICS_REPLY, request_id, payload=reply))
+                else:
+                    writer.write(encode_frame(ERROR, request_id, payload=f"Unknown request kind {kind}".encode()))
+        finally:
+            for task in pending:
+                task.cancel()
+            self.connections -= 1
+            writer.close()
+
+    async def answer(self, writer, request_id, inputs):
+        try:
+            future = asyncio.get_running_loop().create_future()
+            self.queue.put_nowait((inputs, future))
+            self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+            outputs = await future
+            writer.write(encode_frame(RESULT, request_id, outputs))
+            await writer.drain()
+        except Exception as e:
+            self.errors += 1
+            writer.write(encode_frame(ERROR, request_id, payload=str(e).encode()))
+
+    async def batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            rows = batch[0][0].shape[0]
+            deadline = loop.time() + self.batch_window
+            ''' Collect whatever else arrives within the window, up to max_batch rows'''
+            while rows < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0 and self.queue.empty():
+                    break
+                try:
+                    item = self.queue.get_nowait() if not self.queue.empty() else await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                rows += item[0].shape[0]
+
+            inputs = batch[0][0] if len(batch) == 1 else np.concatenate([item[0] for item in batch])
+            start = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.controller.compute_batch, inputs)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.compute_time += time.perf_counter() - start
+
+            offset = 0
+            for item_inputs, future in batch:
+                n = item_inputs.shape[0]
+                if not future.done():
+                    future.set_result(outputs[offset:offset + n])
+                offset += n
+            self.requests += len(batch)
+            self.rows += rows
+            self.batches += 1
+
+    def reset_metrics(self):
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.rows = 0
+        self.batches = 0
+        self.errors = 0
+        self.compute_time = 0.0
+        self.max_queue_depth = 0
+
+    def metrics(self):
+        uptime = time.perf_counter() - self.started
+        return {
+            "uptime_s": uptime,
+            "connections": self.connections,
+            "requests": self.requests,
+            "rows": self.rows,
+            "batches": self.batches,
+            "errors": self.errors,
+            "mean_batch_rows": self.rows / self.batches if self.batches else 0.0,
+            "requests_per_second": self.requests / uptime if uptime > 0 else 0.0,
+            "rows_per_second": self.rows / uptime if uptime > 0 else 0.0,
+            "compute_utilisation": self.compute_time / uptime if uptime > 0 else 0.0,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+
+async def serve(controller, path=None, host="127.0.0.1", port=0, batch_window=0.0005, max_batch=4096, ready=None):
+    server = ControlServer(controller, batch_window, max_batch)
+    await server.start(path, host, port)
+    if ready is not None:
+        ready(server)
+    try:
+        await server.server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    from controller import build_fis
+
+    parser = argparse.ArgumentParser(description="Serve the cart-pole fuzzy controller to local clients")
+    parser.add_argument("--socket", default=None, help="Unix domain socket path (default: TCP on localhost)")
+    parser.add_argument("--port", type=int, default=7878)
+    parser.add_argument("--batch-window-us", type=float, default=500.0)
+    parser.add_argument("--max-batch", type=int, default=4096)
+    args = parser.parse_args()
+
+    def ready(server):
+        print(f"Serving the fuzzy controller on {args.socket or server.address}")
+
+    try:
+        asyncio.run(serve(build_fis().compile(), args.socket, port=args.port,
+                          batch_window=args.batch_window_us * 1e-6, max_batch=args.max_batch, ready=ready))
+    except KeyboardInterrupt:
+        print("Server stopped")
@@ -0,0 +1,99 @@
+import math
+from fuzzy.fuzzy import fuzzy
+
+
+def build_fis():
+    '''Fuzzy Inference system used to balance the cart-pole'''
+    fis = fuzzy("Cartpole-controller", 4, 2, 1 ,8)
+
+    fis.input[0].name = "Theta"
+    fis.input[0].range = [-math.pi, math.pi]
+    fis.input[0].MembershipFunctions[0].name = "Negative"
+    fis.input[0].MembershipFunctions[0].type = "zmf"
+    fis.input[0].MembershipFunctions[0].params = [-0.5, 0.5]
+    fis.input[0].MembershipFunctions[1].name = "Positive"
+    fis.input[0].MembershipFunctions[1].type = "smf"
+    fis.input[0].MembershipFunctions[1].params = [-0.5, 0.5]
+
+    fis.input[1].name = "Theta_dot"
+    fis.input[1].range = [-10, 10]
+    fis.input[1].MembershipFunctions[0].name = "Negative"
+    fis.input[1].MembershipFunctions[0].type = "zmf"
+    fis.input[1].MembershipFunctions[0].params = [-5, 5]
+    fis.input[1].MembershipFunctions[1].name = "Positive"
+    fis.input[1].MembershipFunctions[1].type = "smf"
+    fis.input[1].MembershipFunctions[1].params = [-5, 5]
+
+    fis.input[2].name = "Cart_Position"
+    fis.input[2].range = [-5, 5]
+    fis.input[2].MembershipFunctions[0].name = "Negative"
+    fis.input[2].MembershipFunctions[0].type = "zmf"
+    fis.input[2].MembershipFunctions[0].params = [-1, 1]
+    fis.input[2].MembershipFunctions[1].name = "Positive"
+    fis.input[2].MembershipFunctions[1].type = "smf"
+    fis.input[2].MembershipFunctions[1].params = [-1, 1]
+
+    fis.input[3].name = "Cart_Velocity"
+    fis.input[3].range = [-5, 5]
+    fis.input[3].MembershipFunctions[0].name = "Negative"
+    fis.input[3].MembershipFunctions[0].type = "zmf"
+    fis.input[3].MembershipFunctions[0].params = [-5, 5]
+    fis.input[3].MembershipFunctions[1].name = "Positive"
+    fis.input[3].MembershipFunctions[1].type = "smf"
+    fis.input[3].MembershipFunctions[1].params = [-5, 5]
+    
+    fis.output[0].name = "force"
+    fis.output[0].range = [-20, 20]
+    fis.output[0].MembershipFunctions[0].name = "NM"
+    fis.output[0].MembershipFunctions[0].type = "gbellmf"
+    fis.output[0].MembershipFunctions[0].params = [5, 2, -12]
+    fis.output[0].MembershipFunctions[1].name = "PM"
+    fis.output[0].MembershipFunctions[1].type = "gbellmf"
+    fis.output[0].MembershipFunctions[1].params = [5, 2, 12]
+
+    fis.output[0].MembershipFunctions[2].name = "NL"
+    fis.output[0].MembershipFunctions[2].type = "gbellmf"
+    fis.output[0].MembershipFunctions[2].params = [5, 2, -20]
+    fis.output[0].MembershipFunctions[3].name = "PL"
+    fis.output[0].MembershipFunctions[3].type = "gbellmf"
+    fis.output[0].MembershipFunctions[3].params = [5, 2, 20]
+
+    fis.output[0].MembershipFunctions[4].name = "NS"
+    fis.output[0].MembershipFunctions[4].type = "gbellmf"
+    fis.output[0].MembershipFunctions[4].params = [2, 2, -2]
+    fis.output[0].MembershipFunctions[5].name = "PS"
+    fis.output[0].MembershipFunctions[5].type = "gbellmf"
+    fis.output[0].MembershipFunctions[5].params = [2, 2, 2]
+
+    fis.output[0].MembershipFunctions[6].name = "NM1"
+    fis.output[0].MembershipFunctions[6].type = "gbellmf"
+    fis.output[0].MembershipFunctions[6].params = [3, 2, -6]
+    fis.output[0].MembershipFunctions[7].name = "PM2"
+    fis.output[0].MembershipFunctions[7].type = "gbellmf"
+    fis.output[0].MembershipFunctions[7].params = [3, 2, 6]
+
+  
+
+    rules =[
+        "If Theta is Negative Then Force is NM",
+        "If Theta is Positive Then Force is PM",
+        "If Theta_dot is Negative Then Force is NL",
+        "If Theta_dot is Positive Then Force is PL",
+        "If Cart_Position is Positive Then Force is NS",
+        "If Cart_Position is Negative Then Force is PS",
+        "If Cart_Velocity is Negative Then Force is NM1",
+        "If Cart_Velocity is Positive Then Force is PM1",
+
+        # "If Theta is Negative AND Theta_dot is Positive Then Force is NM",
+        # "If Theta is Positive AND Theta_dot is Negative Then Force is PM",
+        # "If Theta is Negative AND Theta_dot is Negative Then Force is NL",
+        # "If Theta is Positive AND Theta_dot is Positive Then Force is PL",
+        # "If Theta is Positive And Theta_dot is Negative Then Force is NM",
+        # "If Theta is Negative And Theta_dot is Positive Then Force is PM",
+        # "If Theta is Negative And Theta_dot is Negative Then Force is NL",
+        # "If Theta is Positive And Theta_dot is Positive Then Force is PL"  
+        
+    ]
+    
+    fis.add_rule(rules)
+    return fis
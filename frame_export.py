@@ -0,0 +1,130 @@
+import os
+import json
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def encode_png(pixels, size, path):
+    ''' Runs in a worker process'''
+    import pygame
+    surface = pygame.image.frombytes(pixels, size, "RGB")
+    pygame.image.save(surface, path)
+    return path
+
+
+class FrameExporter:
+    '''
+    Hands rendered frames to workers as raw RGB buffers.
+
+    fmt="png" encodes numbered PNGs (frame_000000.png ...) in a process pool.
+    fmt="raw" appends frames to one rgb24 stream (frames.rgb) from a writer thread,
+    with the size and frame rate in frames.json, ready for e.g.
+        ffmpeg -f rawvideo -pix_fmt rgb24 -s WxH -r FPS -i frames.rgb out.mp4
+    At most `max_pending` frames are in flight, which bounds memory use.
+    '''
+    def __init__(self, out_dir, size, fmt="png", fps=30, workers=None, max_pending=None):
+        if fmt not in ("png", "raw"):
+            raise ValueError(f"Unknown frame format: {fmt}")
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.size = tuple(size)
+        self.fmt = fmt
+        self.fps = fps
+        self.frame_index = 0
+        self.pending = deque()
+
+        if fmt == "png":
+            ''' Spawned, not forked, so workers never inherit the renderer's SDL state'''
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            self.max_pending = max_pending or 4 * (workers or os.cpu_count() or 1)
+        else:
+            ''' One writer keeps the stream in order'''
+            self.pool = ThreadPoolExecutor(max_workers=1)
+            self.max_pending = max_pending or 16
+            self.stream = open(os.path.join(out_dir, "frames.rgb"), "wb")
+            self.stream_lock = threading.Lock()
+            with open(os.path.join(out_dir, "frames.json"), "w") as f:
+                json.dump({"width": self.size[0], "height": self.size[1], "pix_fmt": "rgb24", "fps": fps}, f, indent=2)
+
+    def _write_raw(self, pixels):
+        with self.stream_lock:
+            self.stream.write(pixels)
+
+    def submit(self, pixels):
+        while len(self.pending) >= self.max_pending:
+            self.pending.popleft().result()
+
+        if self.fmt == "png":
+            path = os.path.join(self.out_dir, f"frame_{self.frame_index:06d}.png")
+            self.pending.append(self.pool.submit(encode_png, pixels, self.size, path))
+        else:
+            self.pending.append(self.pool.submit(self._write_raw, pixels))
+        self.frame_index += 1
+
+    def close(self):
+        while self.pending:
+            self.pending.popleft().result()
+        self.pool.shutdown()
+        if self.fmt == "raw":
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def render_store(store_path, out_dir, episode=None, fmt="png", fps=30, workers=None, width=800, height=600):
+    ''' Render a trajectory store offscreen as fast as the workers can encode'''
+    from trajectory_store import TrajectoryStore
+    from visualize import RealtimeCartPoleVisualizer
+
+    store = TrajectoryStore(store_path)
+    pole_length = store.schema["metadata"].get("pole_length", 1.0)
+    visualizer = RealtimeCartPoleVisualizer(width, height, pole_length_meters=pole_length, headless=True)
+    exporter = FrameExporter(out_dir, (width, height), fmt, fps, workers)
+
+    '''
+    Frames are picked by simulated time : video frame n (at n / fps seconds) shows
+    the sample current at that time. Samples between frame times are skipped,
+    and a sample is repeated when the video rate is above the sample rate, so
+    the video always plays at real speed at the fps written to frames.json.
+    '''
+    frame_number = 0
+    with exporter:
+        for i, frame in enumerate(store.replay(episode, speed=None)):
+            sample_end = (i + 1) * store.dt
+            repeats = 0
+            while frame_number / fps < sample_end - 1e-9:
+                frame_number += 1
+                repeats += 1
+            if not repeats:
+                continue
+            visualizer.update(**frame, current_time=i * store.dt)
+            pixels = visualizer.get_frame_bytes()
+            for _ in range(repeats):
+                exporter.submit(pixels)
+    visualizer.close()
+    return exporter.frame_index
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Render a trajectory store to an image sequence without a display")
+    parser.add_argument("store")
+    parser.add_argument("out_dir")
+    parser.add_argument("--episode", type=int, default=None)
+    parser.add_argument("--format", choices=["png", "raw"], default="png")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    frames = render_store(args.store, args.out_dir, args.episode, args.format, args.fps, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {frames} frames ({frames / args.fps:.1f}s of video) in {elapsed:.1f}s")
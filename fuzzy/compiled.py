@@ -0,0 +1,319 @@
+import numpy as np
+
+from .memberships_functions import MembershipFunctionFactory as mfs
+from .rule_table import AXES
+
+MF_TYPES = {"zmf": 0, "smf": 1, "gbellmf": 2}
+MF_EVALUATORS = {0: mfs.zmf_array, 1: mfs.smf_array, 2: mfs.gbellmf_array}
+
+OP_NONE = -1
+OP_AND = 0
+OP_OR = 1
+
+''' Tables that follow the engine precision, the index tables keep their integer types'''
+FLOAT_TABLES = ("in_params", "out_grid", "out_curves")
+
+
+def float_dtype(dtype):
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError(f"Unsupported precision: {dtype}, use float32 or float64")
+    return dtype
+
+
+def cast_tables(arrays, dtype):
+    dtype = float_dtype(dtype)
+    return {key: (np.asarray(value, dtype=dtype) if key in FLOAT_TABLES or key.endswith("_weights") else value)
+            for key, value in arrays.items()}
+
+
+''' Fill value of every rule_* column, padding slots and connectives are no-ops'''
+RULE_PADDING = {"rule_inputs": -1, "rule_mfs": 0, "rule_negate": False, "rule_ops": OP_NONE}
+
+
+def rule_rows(parsed, input_names, antecedentLVs):
+    ''' rule_* rows of the parsed rules `parsed`, antecedent slots padded to the longest one'''
+    num_slots = max([len(r["antecedents"]) for r in parsed], default=1)
+    num_ops = max(1, max([len(r["antecedents_operations"]) for r in parsed], default=1))
+
+    rule_inputs = np.full((len(parsed), num_slots), -1, dtype=np.int64)
+    rule_mfs = np.zeros((len(parsed), num_slots), dtype=np.int64)
+    rule_negate = np.zeros((len(parsed), num_slots), dtype=bool)
+    rule_ops = np.full((len(parsed), num_ops), OP_NONE, dtype=np.int8)
+
+    for r, rule in enumerate(parsed):
+        operations = [o.lower() for o in rule["antecedents_operations"]]
+        for j, (key, value) in enumerate(rule["antecedents"].items()):
+            rule_inputs[r, j] = input_names.index(key)
+            rule_mfs[r, j] = antecedentLVs[key].index(value)
+            rule_negate[r, j] = operations[j*2] == "not"
+
+        connectives = [o for o in operations if o in ("and", "or")]
+        for p, o in enumerate(connectives):
+            rule_ops[r, p] = OP_AND if o == "and" else OP_OR
+
+    return {"rule_inputs": rule_inputs, "rule_mfs": rule_mfs, "rule_negate": rule_negate, "rule_ops": rule_ops}
+
+
+def table_arrays(tables):
+    ''' table_<t>_inputs / _consequent / _weights for every RuleTable'''
+    arrays = {}
+    for t, table in enumerate(tables):
+        arrays[f"table_{t}_inputs"] = table.input_index
+        arrays[f"table_{t}_consequent"] = table.consequent_index
+        arrays[f"table_{t}_weights"] = table.cell_weights()
+    return arrays
+
+
+def check_rules(fis):
+    if not fis.ruleHndl.parsed_rules and not fis.ruleHndl.tables:
+        raise ValueError("No rules to compile, call add_rule first")
+
+
+def rule_tables(fis):
+    '''
+    Rule plan of `fis` : antecedent slots, negations, connectives and consequents
+    of the string rules, plus the arrays of every RuleTable.
+    '''
+    check_rules(fis)
+    parsed = list(fis.ruleHndl.parsed_rules.values())
+    plan = rule_rows(parsed, [i.name for i in fis.input], fis.ruleHndl.antecedentsLVs)
+    plan["rule_consequent"] = np.arange(len(parsed), dtype=np.int64)
+    plan.update(table_arrays(fis.ruleHndl.tables))
+    return plan
+
+
+class CompiledFIS:
+    '''
+    Array form of a `fuzzy` system evaluated for N input vectors at once.
+
+    The result matches `fuzzy.compute` : rule connectives are applied the same way
+    as `ruleHandler.rule_inference`, and the i-th rule drives the i-th output
+    membership function as in `fuzzy.defuzzify`. Everything the engine needs lives
+    in `self.arrays`, so a compiled controller can be saved or shared as plain arrays.
+
+    The precision follows the float tables : with float32 tables the memberships,
+    rule strengths, aggregation buffers and outputs are float32 as well.
+    '''
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.dtype = float_dtype(arrays["out_curves"].dtype)
+        self.numIn = int(arrays["in_type"].shape[0])
+        self.numOut = int(arrays["out_grid"].shape[0])
+        self.numRules = int(arrays["rule_inputs"].shape[0])
+
+        ''' Rules grouped by consequent for the max aggregation'''
+        consequent = arrays["rule_consequent"]
+        self.cons_order = np.argsort(consequent, kind="stable")
+        self.cons_ids, self.cons_starts = np.unique(consequent[self.cons_order], return_index=True)
+
+        ''' Rule tables : cells grouped by consequent the same way, empty cells dropped'''
+        self.tables = []
+        t = 0
+        while f"table_{t}_inputs" in arrays:
+            inputs = arrays[f"table_{t}_inputs"]
+            cells = arrays[f"table_{t}_consequent"].ravel()
+            order = np.flatnonzero(cells >= 0)
+            order = order[np.argsort(cells[order], kind="stable")]
+            ids, starts = np.unique(cells[order], return_index=True)
+            shape = arrays[f"table_{t}_consequent"].shape
+            axes = AXES[:len(inputs)]
+            self.tables.append({
+                "inputs": inputs,
+                "sizes": shape,
+                "subscripts": ",".join("n" + a for a in axes) + "->n" + axes,
+                "weights": arrays[f"table_{t}_weights"].ravel()[order],
+                "order": order,
+                "ids": ids,
+                "starts": starts,
+            })
+            t += 1
+
+        self.capacity = 0
+        self.work = {}
+        self.shared = None
+        ''' Row of every rule string in the rule_* arrays, lets with_rules compile only new rules.
+        Unknown (None) for engines rebuilt from bare arrays'''
+        self.rule_index = None
+
+    @classmethod
+    def from_fis(cls, fis, df=0.01, dtype=np.float64):
+        max_mfs = max(i.nummfs for i in fis.input)
+
+        in_type = np.full((fis.numIn, max_mfs), OP_NONE, dtype=np.int8)
+        in_params = np.zeros((fis.numIn, max_mfs, 3), dtype=float)
+        for i, inp in enumerate(fis.input):
+            for j in range(inp.nummfs):
+                mf = inp.MembershipFunctions[j]
+                in_type[i, j] = MF_TYPES.get(mf.type, OP_NONE)
+                in_params[i, j, :len(mf.params)] = mf.params
+
+        ''' Output membership curves sampled on the defuzzification grid'''
+        grids = [np.arange(o.range[0], o.range[1] + df, df) for o in fis.output]
+        grid_len = max(len(g) for g in grids)
+        max_out_mfs = max(o.nummfs for o in fis.output)
+
+        out_grid = np.zeros((fis.numOut, grid_len), dtype=float)
+        out_curves = np.zeros((fis.numOut, max_out_mfs, grid_len), dtype=float)
+        for o, (out, grid) in enumerate(zip(fis.output, grids)):
+            out_grid[o, :len(grid)] = grid
+            for k in range(out.nummfs):
+                mf = out.MembershipFunctions[k]
+                if mf.type in MF_TYPES:
+                    out_curves[o, k, :len(grid)] = MF_EVALUATORS[MF_TYPES[mf.type]](grid, mf.params)
+
+        arrays = {
+            "in_type": in_type,
+            "in_params": in_params,
+            "out_grid": out_grid,
+            "out_curves": out_curves,
+        }
+        arrays.update(rule_tables(fis))
+        compiled = cls(cast_tables(arrays, dtype))
+        compiled.rule_index = {r: i for i, r in enumerate(fis.ruleHndl.rules)}
+        return compiled
+
+    def with_rules(self, fis):
+        '''
+        Engine with the current rules of `fis`, reusing this engine's membership
+        and output curve tables. The rules must use the same inputs and MF names.
+        Rows of rules this engine already has are copied, only new rules are
+        compiled and removed ones are dropped.
+        '''
+        check_rules(fis)
+        arrays = {key: value for key, value in self.arrays.items() if not key.startswith("table_")}
+        rules = fis.ruleHndl.rules
+        if self.rule_index is None:
+            arrays.update(rule_tables(fis))
+        else:
+            source = np.array([self.rule_index.get(r, -1) for r in rules], dtype=np.int64)
+            kept = np.flatnonzero(source >= 0)
+            added = np.flatnonzero(source < 0)
+            parsed = list(fis.ruleHndl.parsed_rules.values())
+            new_rows = rule_rows([parsed[i] for i in added], [i.name for i in fis.input], fis.ruleHndl.antecedentsLVs)
+            for key, fill in RULE_PADDING.items():
+                old, new = self.arrays[key], new_rows[key]
+                width = max(old.shape[1], new.shape[1])
+                rows = np.full((len(rules), width), fill, dtype=old.dtype)
+                rows[kept, :old.shape[1]] = old[source[kept]]
+                rows[added, :new.shape[1]] = new
+                arrays[key] = rows
+            arrays["rule_consequent"] = np.arange(len(rules), dtype=np.int64)
+            arrays.update(table_arrays(fis.ruleHndl.tables))
+        compiled = CompiledFIS(cast_tables(arrays, self.dtype))
+        compiled.rule_index = {r: i for i, r in enumerate(rules)}
+        return compiled
+
+    def astype(self, dtype):
+        ''' The same controller at another precision'''
+        compiled = CompiledFIS(cast_tables(self.arrays, dtype))
+        compiled.rule_index = self.rule_index
+        return compiled
+
+    def share(self, name=None):
+        ''' Publish the arrays in shared memory, workers rebuild the engine with from_shared(tables.handle)'''
+        from .shared import SharedTables
+        return SharedTables.publish(self.arrays, name)
+
+    @classmethod
+    def from_shared(cls, handle):
+        ''' Engine over read-only views of tables published by share(), no copy'''
+        from .shared import SharedTables
+        tables = SharedTables.attach(handle)
+        compiled = cls(tables.arrays)
+        compiled.shared = tables
+        return compiled
+
+    def _reserve(self, n):
+        if n <= self.capacity:
+            return
+        num_in, max_mfs = self.arrays["in_type"].shape
+        num_out_mfs, grid_len = self.arrays["out_curves"].shape[1:]
+        dtype = self.dtype
+        self.work = {
+            "mu": np.zeros((n, num_in, max_mfs), dtype=dtype),
+            "strength": np.zeros((n, num_out_mfs), dtype=dtype),
+            "agg": np.empty((n, grid_len), dtype=dtype),
+            "clip": np.empty((n, grid_len), dtype=dtype),
+            "num": np.empty(n, dtype=dtype),
+            "den": np.empty(n, dtype=dtype),
+        }
+        self.capacity = n
+
+    def memberships(self, inputs, out):
+        in_type = self.arrays["in_type"]
+        in_params = self.arrays["in_params"]
+        for i in range(in_type.shape[0]):
+            for j in range(in_type.shape[1]):
+                if in_type[i, j] == OP_NONE:
+                    out[:, i, j] = 0.0
+                else:
+                    out[:, i, j] = MF_EVALUATORS[int(in_type[i, j])](inputs[:, i], in_params[i, j])
+        return out
+
+    def rule_strengths(self, mu):
+        ''' Firing strength of every rule, shape (N, numRules)'''
+        rule_inputs = self.arrays["rule_inputs"]
+        padded = rule_inputs < 0
+
+        values = mu[:, np.maximum(rule_inputs, 0), self.arrays["rule_mfs"]]
+        values = np.where(self.arrays["rule_negate"], 1.0 - values, values)
+
+        out = values[:, :, 0]
+        if values.shape[2] > 1:
+            rest = values[:, :, 1:]
+            rest_prod = np.where(padded[:, 1:], 1.0, rest).prod(axis=2)
+            rest_max = np.where(padded[:, 1:], 0.0, rest).max(axis=2)
+            for ops in self.arrays["rule_ops"].T:
+                out = np.where(ops == OP_AND, out * rest_prod,
+                      np.where(ops == OP_OR, np.maximum(out, rest_max), out))
+        return out
+
+    def compute_batch(self, inputs, out=None):
+        inputs = np.asarray(inputs, dtype=self.dtype)
+        n = inputs.shape[0]
+        if inputs.shape[1] != self.numIn:
+            raise IndexError(f"Number of Inputs:{inputs.shape[1]} not equal to numIn variable:{self.numIn} ")
+        self._reserve(n)
+        if out is None:
+            out = np.empty((n, self.numOut), dtype=self.dtype)
+
+        mu = self.memberships(inputs, self.work["mu"][:n])
+
+        strength = self.work["strength"][:n]
+        strength.fill(0.0)
+        num_out_mfs = strength.shape[1]
+        if self.numRules:
+            firing = self.rule_strengths(mu)
+            grouped = np.maximum.reduceat(firing[:, self.cons_order], self.cons_starts, axis=1)
+            keep = self.cons_ids < num_out_mfs
+            strength[:, self.cons_ids[keep]] = grouped[:, keep]
+
+        for table in self.tables:
+            ''' Outer product of the per-input membership vectors, one column per cell'''
+            operands = [mu[:, i, :size] for i, size in zip(table["inputs"], table["sizes"])]
+            firing = np.einsum(table["subscripts"], *operands).reshape(n, -1)[:, table["order"]]
+            firing *= table["weights"]
+            grouped = np.maximum.reduceat(firing, table["starts"], axis=1)
+            keep = table["ids"] < num_out_mfs
+            ids = table["ids"][keep]
+            strength[:, ids] = np.maximum(strength[:, ids], grouped[:, keep])
+
+        agg = self.work["agg"][:n]
+        clip = self.work["clip"][:n]
+        num = self.work["num"][:n]
+        den = self.work["den"][:n]
+        for o in range(self.numOut):
+            curves = self.arrays["out_curves"][o]
+            agg.fill(0.0)
+            for k in range(num_out_mfs):
+                np.minimum(curves[k], strength[:, k, None], out=clip)
+                np.maximum(agg, clip, out=agg)
+            np.dot(agg, self.arrays["out_grid"][o], out=num)
+            np.sum(agg, axis=1, out=den)
+            np.divide(num, den, out=out[:, o], where=den != 0.0)
+            out[den == 0.0, o] = 0.0
+        return out
+
+    def compute(self, inputs:list):
+        return list(self.compute_batch(np.asarray(inputs, dtype=self.dtype)[None, :])[0])
@@ -1,9 +1,10 @@
 from .memberships_functions import MembershipFunctionFactory as mfs
+from .compiled import CompiledFIS
+from .rule_table import RuleTable
 import re
 import os
 import math
 import numpy as np
-import matplotlib.pyplot as plt
 
 
 class fuzzy():
@@ -15,38 +16,81 @@ class fuzzy():
             self.antecedentsLVs : dict ={}
             self.consequentLVs : dict ={}
             self.fuzzy_operators = ["and", "or", "not"]
+            self.tables : list = []
       
         def add_rules(self, rule_string:list, antecedentLVs, consequentLVs):
             self.antecedentsLVs = antecedentLVs
             self.consequentLVs = consequentLVs
 
+            ''' Only the new rules are parsed'''
             for r in rule_string:
+                self.parsed_rules[f"rule_{len(self.rules)}"] = self.parse_single(r)
                 self.rules.append(r)
             self.numberOfRules = len(self.rules)
-            self.parse_rule()
-            
+
+        def remove_rules(self, rules:list):
+            '''
+            Remove rules given by index or by rule string. The remaining rules keep
+            their parsed form and are renumbered, rule i still drives output MF i.
+            Nothing is removed unless every entry names an existing rule.
+            '''
+            drop = set()
+            for r in rules:
+                if isinstance(r, (int, np.integer)) and not isinstance(r, (bool, np.bool_)):
+                    if not 0 <= r < len(self.rules):
+                        raise IndexError(f"Rule index {r} out of range for {len(self.rules)} rules")
+                    drop.add(int(r))
+                elif isinstance(r, str) and r in self.rules:
+                    drop.add(self.rules.index(r))
+                else:
+                    raise ValueError(f"Rule not found: {r!r}")
+            parsed = list(self.parsed_rules.values())
+            keep = [i for i in range(len(self.rules)) if i not in drop]
+            self.rules = [self.rules[i] for i in keep]
+            self.parsed_rules = {f"rule_{k}": parsed[i] for k, i in enumerate(keep)}
+            self.numberOfRules = len(self.rules)
+
+        def set_rules(self, rule_string:list):
+            ''' Replace the rule list, parsing only rules that were not seen before'''
+            parsed = {r: p for r, p in zip(self.rules, self.parsed_rules.values())}
+            self.rules = []
+            self.parsed_rules = {}
+            for i, r in enumerate(rule_string):
+                self.parsed_rules[f"rule_{i}"] = parsed[r] if r in parsed else self.parse_single(r)
+                self.rules.append(r)
+            self.numberOfRules = len(self.rules)
+
         def parse_rule(self):
-            antecedents_dict : dict = {}
-            consequents_dict : dict = {}
+            ''' Re-parse every rule'''
+            self.parsed_rules = {}
             for i,r in enumerate(self.rules):
-                splited = r.split("Then")
-                antecedents = splited[0].split("If")[-1]
-                consequents = splited[1]     
+                self.parsed_rules[f"rule_{i}"] = self.parse_single(r)
 
-                keywords_a = [kw.lower().replace("is not", "not") 
-                    for kw in re.findall(r"\b(?:is not|is|and|or)\b", antecedents, flags=re.IGNORECASE)]
-                antecedents_dict = dict(re.findall(r"(\w+)\s+is(?:\s+not)?\s+(\w+)", antecedents, flags=re.IGNORECASE))
+        def parse_single(self, r):
+            splited = r.split("Then")
+            if len(splited) != 2:
+                raise ValueError(f"Rule must have one If and one Then part: {r}")
+            antecedents = splited[0].split("If")[-1]
+            consequents = splited[1]     
 
-                keywords_c = [kw.lower().replace("is not", "not") 
-                    for kw in re.findall(r"\b(?:is not|is|and|or)\b", consequents, flags=re.IGNORECASE)]
-                consequents_dict = dict(re.findall(r"(\w+)\s+is\s+(\w+)", consequents))
+            keywords_a = [kw.lower().replace("is not", "not") 
+                for kw in re.findall(r"\b(?:is not|is|and|or)\b", antecedents, flags=re.IGNORECASE)]
+            antecedents_dict = dict(re.findall(r"(\w+)\s+is(?:\s+not)?\s+(\w+)", antecedents, flags=re.IGNORECASE))
+
+            keywords_c = [kw.lower().replace("is not", "not") 
+                for kw in re.findall(r"\b(?:is not|is|and|or)\b", consequents, flags=re.IGNORECASE)]
+            consequents_dict = dict(re.findall(r"(\w+)\s+is\s+(\w+)", consequents))
+
+            return {
+                "antecedents_operations": keywords_a,
+                "antecedents": antecedents_dict,
+                "consequents_operations": keywords_c,
+                "consequents": consequents_dict
+            }
+
+        def add_rule_table(self, table):
+            self.tables.append(table)
 
-                self.parsed_rules[f"rule_{i}"] = {
-                    "antecedents_operations": keywords_a,
-                    "antecedents": antecedents_dict,
-                    "consequents_operations": keywords_c,
-                    "consequents": consequents_dict
-                }
         def fuzzy_or(self, x, y):
             return max(x,y)
         
@@ -112,6 +156,13 @@ class fuzzy():
                 ouptut_list.append(out) 
                 # print("   Out",out)
 
+            ''' Rule tables add their strengths per consequent MF, combined with max'''
+            for table in self.tables:
+                size = max(len(ouptut_list), table.num_out_mfs())
+                ouptut_list += [0.0] * (size - len(ouptut_list))
+                strengths = table.strengths(memFunc_values, size)
+                ouptut_list = [max(a, b) for a, b in zip(ouptut_list, strengths)]
+
             # print(f"Inferene output: {ouptut_list}")
 
             
@@ -201,6 +252,31 @@ class fuzzy():
         self.update_linguistic_variable()
         self.ruleHndl.add_rules(rule, self.antecedentLnguisticVariables, self.consequentLnguisticVariables)
 
+    def add_rule_table(self, table):
+        ''' Add a RuleTable, evaluated together with the string rules'''
+        self.update_linguistic_variable()
+        self.ruleHndl.antecedentsLVs = self.antecedentLnguisticVariables
+        self.ruleHndl.consequentLVs = self.consequentLnguisticVariables
+        table.bind([i.name for i in self.input], self.antecedentLnguisticVariables, self.consequentLnguisticVariables)
+        self.ruleHndl.add_rule_table(table)
+        return table
+
+    def remove_rule(self, rule):
+        ''' Remove one rule (index or rule string) or a list of them'''
+        if isinstance(rule, (str, int, np.integer)):
+            rule = [rule]
+        self.ruleHndl.remove_rules(rule)
+
+    def set_rules(self, rule):
+        self.update_linguistic_variable()
+        self.ruleHndl.antecedentsLVs = self.antecedentLnguisticVariables
+        self.ruleHndl.consequentLVs = self.consequentLnguisticVariables
+        self.ruleHndl.set_rules(rule)
+
+    def compile(self, df=0.01, dtype=np.float64):
+        ''' Array form of this system for batched evaluation, see CompiledFIS'''
+        return CompiledFIS.from_fis(self, df, dtype)
+
     def defuzzify(self, mem_fun_params,range,out_idx):
 
         df=0.01
@@ -258,6 +334,8 @@ class fuzzy():
     def visualize_memFunc(self, dir_path=None):
         if dir_path is None:
             raise ValueError("Output directory path not provided")
+        # Imported here so compute-only users never load matplotlib
+        import matplotlib.pyplot as plt
 
         os.makedirs(dir_path, exist_ok=True)
         dt = 0.01
@@ -1,5 +1,4 @@
 import numpy as np
-import matplotlib.pyplot as plt
 import math
 
 class MembershipFunctionFactory():
@@ -68,9 +67,39 @@ class MembershipFunctionFactory():
         output = 1 / den
 
         return output
+
+    ''' Array versions of the membership functions, used by the compiled engine'''
+    @staticmethod
+    def zmf_array(x, params):
+        a = params[0]
+        b = params[1]
+        ratio_a = (x - a) / (b - a)
+        ratio_b = (x - b) / (b - a)
+        return np.where(x <= a, 1.0,
+               np.where(x <= (a+b)/2, 1 - 2*ratio_a*ratio_a,
+               np.where(x < b, 2*ratio_b*ratio_b, 0.0)))
+
+    @staticmethod
+    def smf_array(x, params):
+        a = params[0]
+        b = params[1]
+        ratio_a = (x - a) / (b - a)
+        ratio_b = (x - b) / (b - a)
+        return np.where(x <= a, 0.0,
+               np.where(x <= (a+b)/2, 2*ratio_a*ratio_a,
+               np.where(x < b, 1 - 2*ratio_b*ratio_b, 1.0)))
+
+    @staticmethod
+    def gbellmf_array(x, params):
+        a = params[0]
+        b = params[1]
+        c = params[2]
+        ratio = (x - c) / a
+        return 1 / (1 + np.power(ratio, 2*b))
     
 # Validate Curves
 # if __name__ == "__main__":
+#     import matplotlib.pyplot as plt
 
 #     dt = 0.01
 #     stop_theta = 3.14
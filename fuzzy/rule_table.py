@@ -0,0 +1,108 @@
+import re
+import numpy as np
+
+AXES = "abcdefghijklmopqrstuvwxyz"
+
+
+class RuleTable:
+    '''
+    Complete grid rule base in tensor form.
+
+    One cell per combination of the MFs of `inputs` (in that axis order); the cell
+    holds the index (or name) of the output MF it drives, or -1 / None for no rule.
+    A cell fires with the product of its memberships (the "and" of the string rules)
+    times its weight, computed for all cells at once as an outer product. Cells
+    driving the same output MF are combined with max, like separate string rules.
+
+        table = RuleTable(["Theta", "Theta_dot"], [["NL", "NM"], ["PM", "PL"]])
+        fis.add_rule_table(table)
+    '''
+    def __init__(self, inputs, consequents, weights=None, output=None):
+        self.inputs = list(inputs)
+        self.consequents = np.asarray(consequents, dtype=object)
+        if self.consequents.ndim != len(self.inputs):
+            raise ValueError(f"Rule table has {self.consequents.ndim} axes for {len(self.inputs)} inputs")
+        self.weights = None if weights is None else np.asarray(weights, dtype=float)
+        if self.weights is not None and self.weights.shape != self.consequents.shape:
+            raise ValueError("Rule weights must have the shape of the rule table")
+        self.output = output
+
+        ''' Set by bind'''
+        self.input_index = None
+        self.consequent_index = None
+        self.output_mfs = 0
+
+    @property
+    def shape(self):
+        return self.consequents.shape
+
+    def bind(self, input_names, antecedentLVs, consequentLVs):
+        ''' Resolve input names and consequent MF names against a fuzzy system'''
+        for name, size in zip(self.inputs, self.shape):
+            if name not in antecedentLVs:
+                raise KeyError(f"Unknown input in rule table: {name}")
+            if size != len(antecedentLVs[name]):
+                raise ValueError(f"Rule table axis {name} has {size} entries, the input has {len(antecedentLVs[name])} MFs")
+        self.input_index = np.array([input_names.index(name) for name in self.inputs], dtype=np.int64)
+
+        output = self.output if self.output is not None else list(consequentLVs.keys())[0]
+        mf_names = consequentLVs[output]
+        self.output_mfs = len(mf_names)
+        index = np.full(self.shape, -1, dtype=np.int64)
+        for cell, value in np.ndenumerate(self.consequents):
+            if value is None or (isinstance(value, (int, np.integer)) and value < 0):
+                continue
+            index[cell] = mf_names.index(value) if isinstance(value, str) else int(value)
+        self.consequent_index = index
+        return self
+
+    def cell_weights(self):
+        return np.ones(self.shape) if self.weights is None else self.weights
+
+    def firing(self, memberships):
+        ''' memberships : one MF vector per table input (1-D) or per sample (N, m), returns the cell strengths'''
+        operands = [np.asarray(m, dtype=float) for m in memberships]
+        batch = "n" if operands[0].ndim == 2 else ""
+        axes = AXES[:len(operands)]
+        subscripts = ",".join(batch + a for a in axes) + "->" + batch + axes
+        return np.einsum(subscripts, *operands) * self.cell_weights()
+
+    def strengths(self, memFunc_values, num_out_mfs):
+        ''' Strength per output MF for one sample, memFunc_values as in rule_inference'''
+        mu = [memFunc_values[i] for i in self.input_index]
+        firing = self.firing(mu)
+        out = np.zeros(num_out_mfs)
+        valid = self.consequent_index >= 0
+        np.maximum.at(out, self.consequent_index[valid], firing[valid])
+        return out
+
+    def num_out_mfs(self):
+        ''' Every MF of the output, or more if a cell points past them'''
+        return max(self.output_mfs, int(self.consequent_index.max()) + 1 if self.consequent_index.size else 0)
+
+    @classmethod
+    def from_rules(cls, rules, antecedentLVs):
+        '''
+        Table from string rules that each "and" together one MF of every input.
+        With the positional convention of the string rules, rule i drives output MF i.
+        Rules of two inputs give the same strengths as the string form; with more
+        inputs the table uses the plain product, while rule_inference applies the
+        "and" once per connective.
+        '''
+        inputs = None
+        table = None
+        for i, r in enumerate(rules):
+            antecedents = r.split("Then")[0].split("If")[-1]
+            if re.search(r"\b(?:or|not)\b", antecedents, flags=re.IGNORECASE):
+                raise ValueError(f"Only 'and' rules can go into a rule table: {r}")
+            pairs = re.findall(r"(\w+)\s+is\s+(\w+)", antecedents, flags=re.IGNORECASE)
+            if inputs is None:
+                inputs = [name for name, _ in pairs]
+                table = np.full([len(antecedentLVs[name]) for name in inputs], -1, dtype=object)
+            elif [name for name, _ in pairs] != inputs:
+                raise ValueError(f"Rule does not use the table inputs {inputs}: {r}")
+            cell = tuple(antecedentLVs[name].index(value) for name, value in pairs)
+            if table[cell] != -1:
+                raise ValueError(f"Two rules for the same table cell: {r}")
+            table[cell] = i
+        return cls(inputs, table)
@@ -0,0 +1,102 @@
+import sys
+import json
+import weakref
+import numpy as np
+from multiprocessing import shared_memory
+
+'''
+Controller tables in one shared memory segment.
+
+The publishing process packs a dict of arrays (CompiledFIS.arrays, or any other
+precomputed tables) into a single segment; workers attach with the small,
+picklable `handle` and get read-only NumPy views onto the same pages, so no
+worker copies or unpickles the tables.
+
+Only the publisher unlinks the segment. Attached processes just close their
+mapping, and are kept out of the multiprocessing resource tracker so a worker
+exiting never removes the segment from under the others.
+'''
+
+ALIGNMENT = 64
+
+
+class SharedTables:
+    def __init__(self, shm, manifest, owner):
+        self.shm = shm
+        self.manifest = manifest
+        self.owner = owner
+        self.arrays = {}
+        for key, (dtype, shape, offset) in manifest.items():
+            view = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+            view.flags.writeable = False
+            self.arrays[key] = view
+        ''' Last resort if close is never called; the publisher also unlinks'''
+        self._finalizer = weakref.finalize(self, SharedTables._release, shm, owner)
+
+    @classmethod
+    def publish(cls, arrays, name=None):
+        manifest = {}
+        size = 0
+        for key, array in arrays.items():
+            array = np.asarray(array)
+            size = -(-size // ALIGNMENT) * ALIGNMENT
+            manifest[key] = (array.dtype.str, list(array.shape), size)
+            size += array.nbytes
+
+        shm = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+        for key, array in arrays.items():
+            dtype, shape, offset = manifest[key]
+            np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)[...] = array
+        return cls(shm, manifest, owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        name, manifest = handle
+        if isinstance(manifest, str):
+            manifest = json.loads(manifest)
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            ''' Before 3.13 attaching registers the segment with the resource tracker,
+            which would unlink it when this process exits, so skip the registration'''
+            from multiprocessing import resource_tracker
+            register = resource_tracker.register
+            resource_tracker.register = lambda name, rtype : None if rtype == "shared_memory" else register(name, rtype)
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            finally:
+                resource_tracker.register = register
+        return cls(shm, manifest, owner=False)
+
+    @property
+    def handle(self):
+        ''' (segment name, manifest), cheap to pickle into worker arguments'''
+        return (self.shm.name, self.manifest)
+
+    @property
+    def nbytes(self):
+        return self.shm.size
+
+    @staticmethod
+    def _release(shm, owner):
+        try:
+            shm.close()
+        except BufferError:
+            ''' Views are still alive somewhere; the mapping goes away with the process'''
+            pass
+        if owner:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+    def close(self):
+        ''' Drop the views and the mapping; the publisher also unlinks the segment'''
+        self.arrays = {}
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,154 @@
+import json
+import math
+import time
+import numpy as np
+
+'''
+Latency accounting for the real-time loop.
+
+Every phase (controller compute, integration, worker tick, render) gets an
+HDR-style histogram: values are bucketed log-linearly, so the relative error
+is bounded by the number of significant digits at any magnitude, from
+microseconds to seconds, in a fixed amount of memory. Durations longer than
+the phase's deadline are counted as misses.
+'''
+
+
+class LatencyHistogram:
+    def __init__(self, highest_ns=60 * 10**9, significant_digits=2):
+        self.sub_bucket_bits = int(math.ceil(math.log2(2 * 10**significant_digits)))
+        self.sub_bucket_half = 1 << (self.sub_bucket_bits - 1)
+        self.highest_ns = highest_ns
+        self.counts = np.zeros(self.index_of(highest_ns) + 1, dtype=np.int64)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.clipped = 0
+
+    def index_of(self, value):
+        bucket = max(0, value.bit_length() - self.sub_bucket_bits)
+        return bucket * self.sub_bucket_half + (value >> bucket)
+
+    def value_at_index(self, index):
+        ''' Highest value that lands in this bucket'''
+        bucket = max(0, index // self.sub_bucket_half - 1)
+        sub = index - bucket * self.sub_bucket_half
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, value_ns):
+        value = int(value_ns)
+        if value < 0:
+            value = 0
+        if value > self.highest_ns:
+            self.clipped += 1
+            value = self.highest_ns
+        self.counts[self.index_of(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        if self.count == 0:
+            return 0
+        rank = max(1, int(math.ceil(self.count * q / 100.0)))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self.value_at_index(index), self.max)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        self.counts[:] = 0
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.clipped = 0
+
+
+class PhaseTiming:
+    def __init__(self, name, deadline=None):
+        self.name = name
+        self.deadline_ns = None if deadline is None else int(deadline * 1e9)
+        self.histogram = LatencyHistogram()
+        self.misses = 0
+        self.worst_overrun_ns = 0
+
+    def record(self, elapsed_ns):
+        self.histogram.record(elapsed_ns)
+        if self.deadline_ns is not None and elapsed_ns > self.deadline_ns:
+            self.misses += 1
+            self.worst_overrun_ns = max(self.worst_overrun_ns, elapsed_ns - self.deadline_ns)
+
+    def summary(self):
+        h = self.histogram
+        us = lambda ns : ns / 1000.0
+        return {
+            "count": h.count,
+            "mean_us": us(h.mean()),
+            "min_us": us(h.min or 0),
+            "p50_us": us(h.percentile(50)),
+            "p90_us": us(h.percentile(90)),
+            "p99_us": us(h.percentile(99)),
+            "p999_us": us(h.percentile(99.9)),
+            "max_us": us(h.max),
+            "deadline_us": None if self.deadline_ns is None else us(self.deadline_ns),
+            "misses": self.misses,
+            "miss_rate": self.misses / h.count if h.count else 0.0,
+            "worst_overrun_us": us(self.worst_overrun_ns),
+        }
+
+
+class LoopTimer:
+    '''
+    Named phases with optional deadlines in seconds, e.g.
+        timer = LoopTimer({"compute": 0.01, "integrate": 0.001, "render": 1 / 60})
+        t0 = time.perf_counter_ns(); ...; timer.record("compute", time.perf_counter_ns() - t0)
+    Each phase should be recorded from one thread only; different phases may
+    be recorded from different threads.
+    '''
+    def __init__(self, deadlines=None):
+        self.phases = {}
+        self.started_ns = time.perf_counter_ns()
+        for name, deadline in (deadlines or {}).items():
+            self.add_phase(name, deadline)
+
+    def add_phase(self, name, deadline=None):
+        self.phases[name] = PhaseTiming(name, deadline)
+        return self.phases[name]
+
+    def record(self, name, elapsed_ns):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.add_phase(name)
+        phase.record(elapsed_ns)
+
+    def summary(self):
+        return {
+            "wall_time_s": (time.perf_counter_ns() - self.started_ns) / 1e9,
+            "phases": {name: phase.summary() for name, phase in self.phases.items()},
+        }
+
+    def overlay_lines(self):
+        ''' Short per-phase lines for the on-screen overlay'''
+        lines = []
+        for name, phase in self.phases.items():
+            s = phase.summary()
+            lines.append(f"{name:<9} p50 {s['p50_us']:7.0f}us  p99 {s['p99_us']:7.0f}us  miss {s['misses']}")
+        return lines
+
+    def format_summary(self):
+        lines = [f"{'phase':<10}{'count':>9}{'p50 us':>10}{'p99 us':>10}{'p99.9 us':>10}{'max us':>10}{'deadline':>10}{'misses':>8}"]
+        for name, phase in self.phases.items():
+            s = phase.summary()
+            deadline = "-" if s["deadline_us"] is None else f"{s['deadline_us']:.0f}"
+            lines.append(f"{name:<10}{s['count']:>9}{s['p50_us']:>10.1f}{s['p99_us']:>10.1f}{s['p999_us']:>10.1f}{s['max_us']:>10.1f}{deadline:>10}{s['misses']:>8}")
+        return "\n".join(lines)
+
+    def export(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
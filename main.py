@@ -1,239 +1,138 @@
 
 import time
-import math
 import os
-import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.ticker import MaxNLocator
-from fuzzy.fuzzy import fuzzy
-
-from cartpole import cartople
-from rk4 import rk4
+from controller import build_fis
+
+from simulation import CartPoleSimulation
+from scheduler import MultiRateScheduler
+from pipeline import SimulationThread, SIM_TIME
+from loop_timing import LoopTimer
+from rule_reload import RuleFileWatcher, read_rules, write_rules
+from checkpoint import InputLog, Snapshot, SnapshotWriter
 from visualize import RealtimeCartPoleVisualizer
+from trajectory_store import TrajectoryStoreWriter, PLOT_CHANNELS
+from plotting import plot_episode
 
 
 
-from matplotlib.ticker import MaxNLocator
-def plot_graph(dt, lv, dir_path, filename, show_img=False):
-    if dir_path is None:
-        raise ValueError("Output directory path not provided")
-
-    os.makedirs(dir_path, exist_ok=True)
-
-    force      = lv[0, :]
-    target     = lv[1, :]
-    car_vel    = lv[2, :]
-    car_pos    = lv[3, :]
-    pole_vel   = lv[4, :]
-    pole_angle = np.degrees(lv[5, :])
-
-    time = np.arange(0, len(force) * dt, dt)
-
-    # create "grid" layout for subplots
-    fig = plt.figure(figsize=(8, 12))
-
-    # --- Plot 1: Force ---
-    ax1 = plt.subplot2grid((5,1), (0,0))
-    ax1.plot(time, force, color='tab:blue')
-    ax1.set_ylabel('Force (N)')
-    ax1.set_title('Force vs Time')
-    ax1.grid(True)
-    ax1.xaxis.set_major_locator(MaxNLocator(nbins=10))
-    ax1.yaxis.set_major_locator(MaxNLocator(nbins=10))
-
-    # --- Plot 2: Target & Cart Position ---
-    ax2 = plt.subplot2grid((5,1), (1,0))
-    ax2.plot(time, target, label="Target", color='tab:red')
-    ax2.plot(time, car_pos, label="Cart Position", color='tab:orange')
-    ax2.set_ylabel('Position (m)')
-    ax2.set_title('Target & Cart Position vs Time')
-    ax2.legend()
-    ax2.grid(True)
-    ax2.xaxis.set_major_locator(MaxNLocator(nbins=10))
-    ax2.yaxis.set_major_locator(MaxNLocator(nbins=10))
-
-    # --- Plot 3a: Car Velocity ---
-    ax3 = plt.subplot2grid((5,1), (2,0))
-    ax3.plot(time, car_vel, color='tab:blue')
-    ax3.set_ylabel('Car Vel (m/s)')
-    ax3.grid(True)
-
-    # --- Plot 3b: Pole Velocity ---
-    ax4 = plt.subplot2grid((5,1), (3,0))
-    ax4.plot(time, pole_vel, color='tab:green')
-    ax4.set_ylabel('Pole Vel (rad/s)')
-    ax4.grid(True)
-
-    # --- Plot 3c: Pole Angle ---
-    ax5 = plt.subplot2grid((5,1), (4,0))
-    ax5.plot(time, pole_angle, color='tab:purple')
-    ax5.set_ylabel('Pole Angle (deg)')
-    ax5.set_xlabel('Time (s)')
-    ax5.grid(True)
-
-    plt.tight_layout()
-    plt.savefig(f"{dir_path}/{filename}", dpi=600)
-
-    if show_img:
-        plt.show()
-    else:
-        plt.close()
-
-
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Fuzzy controlled cart-pole")
+    parser.add_argument("--physics-hz", type=float, default=20.0, help="Integration rate of the plant")
+    parser.add_argument("--control-hz", type=float, default=20.0, help="Update rate of the fuzzy controller")
+    parser.add_argument("--render-hz", type=float, default=60.0, help="Frame rate of the visualizer")
+    parser.add_argument("--timing-overlay", action="store_true", help="Show loop latency and deadline misses on screen")
+    parser.add_argument("--rules", default=None, help="Rule file to load and watch, edits are applied while running")
+    parser.add_argument("--restore", default=None, help="Resume from a snapshot, its rates and controller replace the defaults")
+    parser.add_argument("--snapshot-dir", default=None, help="Write periodic snapshots and last.snap on exit to this directory")
+    parser.add_argument("--log-dir", default=None, help="Telemetry and timing output (default: a new logs/session-<timestamp> per run)")
+    parser.add_argument("--snapshot-every", type=float, default=60.0, help="Simulated seconds between periodic snapshots")
+    args = parser.parse_args()
+
     '''Fuzzy Inference system'''
-    fis = fuzzy("Cartpole-controller", 4, 2, 1 ,8)
-
-    fis.input[0].name = "Theta"
-    fis.input[0].range = [-math.pi, math.pi]
-    fis.input[0].MembershipFunctions[0].name = "Negative"
-    fis.input[0].MembershipFunctions[0].type = "zmf"
-    fis.input[0].MembershipFunctions[0].params = [-0.5, 0.5]
-    fis.input[0].MembershipFunctions[1].name = "Positive"
-    fis.input[0].MembershipFunctions[1].type = "smf"
-    fis.input[0].MembershipFunctions[1].params = [-0.5, 0.5]
-
-    fis.input[1].name = "Theta_dot"
-    fis.input[1].range = [-10, 10]
-    fis.input[1].MembershipFunctions[0].name = "Negative"
-    fis.input[1].MembershipFunctions[0].type = "zmf"
-    fis.input[1].MembershipFunctions[0].params = [-5, 5]
-    fis.input[1].MembershipFunctions[1].name = "Positive"
-    fis.input[1].MembershipFunctions[1].type = "smf"
-    fis.input[1].MembershipFunctions[1].params = [-5, 5]
-
-    fis.input[2].name = "Cart_Position"
-    fis.input[2].range = [-5, 5]
-    fis.input[2].MembershipFunctions[0].name = "Negative"
-    fis.input[2].MembershipFunctions[0].type = "zmf"
-    fis.input[2].MembershipFunctions[0].params = [-1, 1]
-    fis.input[2].MembershipFunctions[1].name = "Positive"
-    fis.input[2].MembershipFunctions[1].type = "smf"
-    fis.input[2].MembershipFunctions[1].params = [-1, 1]
-
-    fis.input[3].name = "Cart_Velocity"
-    fis.input[3].range = [-5, 5]
-    fis.input[3].MembershipFunctions[0].name = "Negative"
-    fis.input[3].MembershipFunctions[0].type = "zmf"
-    fis.input[3].MembershipFunctions[0].params = [-5, 5]
-    fis.input[3].MembershipFunctions[1].name = "Positive"
-    fis.input[3].MembershipFunctions[1].type = "smf"
-    fis.input[3].MembershipFunctions[1].params = [-5, 5]
-    
-    fis.output[0].name = "force"
-    fis.output[0].range = [-20, 20]
-    fis.output[0].MembershipFunctions[0].name = "NM"
-    fis.output[0].MembershipFunctions[0].type = "gbellmf"
-    fis.output[0].MembershipFunctions[0].params = [5, 2, -12]
-    fis.output[0].MembershipFunctions[1].name = "PM"
-    fis.output[0].MembershipFunctions[1].type = "gbellmf"
-    fis.output[0].MembershipFunctions[1].params = [5, 2, 12]
-
-    fis.output[0].MembershipFunctions[2].name = "NL"
-    fis.output[0].MembershipFunctions[2].type = "gbellmf"
-    fis.output[0].MembershipFunctions[2].params = [5, 2, -20]
-    fis.output[0].MembershipFunctions[3].name = "PL"
-    fis.output[0].MembershipFunctions[3].type = "gbellmf"
-    fis.output[0].MembershipFunctions[3].params = [5, 2, 20]
-
-    fis.output[0].MembershipFunctions[4].name = "NS"
-    fis.output[0].MembershipFunctions[4].type = "gbellmf"
-    fis.output[0].MembershipFunctions[4].params = [2, 2, -2]
-    fis.output[0].MembershipFunctions[5].name = "PS"
-    fis.output[0].MembershipFunctions[5].type = "gbellmf"
-    fis.output[0].MembershipFunctions[5].params = [2, 2, 2]
-
-    fis.output[0].MembershipFunctions[6].name = "NM1"
-    fis.output[0].MembershipFunctions[6].type = "gbellmf"
-    fis.output[0].MembershipFunctions[6].params = [3, 2, -6]
-    fis.output[0].MembershipFunctions[7].name = "PM2"
-    fis.output[0].MembershipFunctions[7].type = "gbellmf"
-    fis.output[0].MembershipFunctions[7].params = [3, 2, 6]
-
-  
-
-    rules =[
-        "If Theta is Negative Then Force is NM",
-        "If Theta is Positive Then Force is PM",
-        "If Theta_dot is Negative Then Force is NL",
-        "If Theta_dot is Positive Then Force is PL",
-        "If Cart_Position is Positive Then Force is NS",
-        "If Cart_Position is Negative Then Force is PS",
-        "If Cart_Velocity is Negative Then Force is NM1",
-        "If Cart_Velocity is Positive Then Force is PM1",
-
-        # "If Theta is Negative AND Theta_dot is Positive Then Force is NM",
-        # "If Theta is Positive AND Theta_dot is Negative Then Force is PM",
-        # "If Theta is Negative AND Theta_dot is Negative Then Force is NL",
-        # "If Theta is Positive AND Theta_dot is Positive Then Force is PL",
-        # "If Theta is Positive And Theta_dot is Negative Then Force is NM",
-        # "If Theta is Negative And Theta_dot is Positive Then Force is PM",
-        # "If Theta is Negative And Theta_dot is Negative Then Force is NL",
-        # "If Theta is Positive And Theta_dot is Positive Then Force is PL"  
-        
-    ]
-    
-    fis.add_rule(rules)
+    fis = build_fis()
     # fis.visualize_memFunc("/home/kuns/stuffs/AI_lab/Fuzzy-CartPole/Images/member_functions")
      
-    '''Simulation time'''
-    dt = 0.05
-    present_time = 0
-
     cart_mass = 1
     pole_mass = 0.1
     pole_length = 1
 
-    ''' states : x_dot, x, w_dot, w'''
-    states = [ 0.0,0.0,0.0,0.0]      
-    theta = states[3]
-    cartople_ = cartople(cart_mass, pole_mass, pole_length)
+    '''Simulation, physics and control run at fixed rates independent of the frame rate.
+    The compiled controller gives the same outputs and is fast enough for 100 Hz and up.'''
+    if args.restore:
+        scheduler = Snapshot.load(args.restore).restore()
+        simulation = scheduler.simulation
+        cart_mass, pole_mass, pole_length = simulation.cart_mass, simulation.pole_mass, simulation.pole_length
+    else:
+        simulation = CartPoleSimulation(fis.compile(), cart_mass, pole_mass, pole_length)
+        scheduler = MultiRateScheduler(simulation, args.physics_hz, args.control_hz)
+        scheduler.input_log = InputLog()
+    dt = scheduler.physics_dt
+
+    '''Rule hot reload, a missing rule file is created from the built-in rules'''
+    watcher = None
+    if args.rules:
+        if os.path.exists(args.rules):
+            fis.set_rules(read_rules(args.rules))
+            simulation.fis = simulation.fis.with_rules(fis)
+        else:
+            write_rules(args.rules, fis.ruleHndl.rules)
+        watcher = RuleFileWatcher(args.rules, fis, simulation.fis, lambda compiled : setattr(simulation, "fis", compiled))
+        watcher.start()
 
     '''visualizer'''
     visualizer = RealtimeCartPoleVisualizer(
         pole_length_meters=pole_length,
         cart_width_meters=1.0,
-        cart_height_meters=0.5
+        cart_height_meters=0.5,
+        fps=int(args.render_hz)
     )
+    visualizer.set_target_position(simulation.target)
+
+    '''Telemetry log, written in chunks from a background thread, one row per physics step'''
+    telemetry_path = args.log_dir or os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs",
+                                                  time.strftime("session-%Y%m%d-%H%M%S"))
+    telemetry = TrajectoryStoreWriter(
+        telemetry_path,
+        channels=PLOT_CHANNELS,
+        units=["N", "m", "m/s", "m", "rad/s", "rad"],
+        metadata={"dt": dt, "control_dt": dt * scheduler.control_ratio, "cart_mass": cart_mass, "pole_mass": pole_mass, "pole_length": pole_length},
+    )
+    '''Periodic snapshots, captured on the simulation thread and written in the background'''
+    snapshots = None
+    if args.snapshot_dir:
+        snapshots = SnapshotWriter(args.snapshot_dir, round(args.snapshot_every / dt))
+
+    def on_physics_step(sim):
+        telemetry.append(sim.log_row())
+        if snapshots is not None:
+            snapshots.on_physics_step(scheduler)
+    scheduler.on_physics_step = on_physics_step
+
+    '''Latency histograms per phase, durations over the phase's period count as deadline misses'''
+    timer = LoopTimer({
+        "compute": dt * scheduler.control_ratio,
+        "integrate": dt,
+        "tick": dt,
+        "render": 1.0 / args.render_hz,
+    })
+    scheduler.timer = timer
+
+    '''Physics and control run on a worker thread, this thread only renders the latest snapshot'''
+    worker = SimulationThread(scheduler, visualizer.get_target_position())
+    worker.start()
 
     target_pos = 0.0
-    logged_variables =[]
-    while(True):
-        start = time.time()
-        target_pos = visualizer.get_target_position()
-
-        outputs = fis.compute([theta,states[2],(target_pos - states[1]),states[0]])
-        force = outputs[0]
+    try:
+        while(True):
+            target_pos = visualizer.get_target_position()
+            worker.target.set(target_pos)
 
-        fn = lambda y : cartople_(y,force, 9.8)
-        states = rk4(fn, states, dt )
-
-        theta = (states[3] + math.pi) % (2 * math.pi) - math.pi
-        states[3] = theta
-
-        # Get current target position from slider
-        cart_vel = states[0]
-        cart_pos = states[1]
-        pole_vel = states[2]
-        pole_angle = states[3]
+            snapshot = worker.latest()
+            cart_vel, cart_pos, pole_vel, pole_angle = worker.interpolated_states(snapshot)
     
-        if not visualizer.update(cart_pos, pole_angle, cart_vel, pole_vel):
-            print("Visualization Ended")
-            break
-
-        present_time += dt
-        finish = time.time()
-        logged_variables.append([
-            float(force),
-            float(target_pos),
-            float(cart_vel),
-            float(cart_pos),
-            float(pole_vel),
-            float(pole_angle)
-        ])
-       
-    logged_variables = np.array(logged_variables).T
+            if not visualizer.update(cart_pos, pole_angle, cart_vel, pole_vel, current_time=snapshot[SIM_TIME]):
+                print("Visualization Ended")
+                break
+            timer.record("render", visualizer.draw_time_ns)
+            if args.timing_overlay and visualizer.frame_count % 15 == 0:
+                visualizer.set_overlay(timer.overlay_lines())
+            if worker.error is not None:
+                break
+    except KeyboardInterrupt:
+        print("Interrupted")
+
+    worker.stop()
+    if watcher is not None:
+        watcher.stop()
+    if snapshots is not None:
+        snapshots.close()
+        Snapshot.capture(scheduler).save(os.path.join(args.snapshot_dir, "last.snap"))
+    telemetry.close()
+    print(timer.format_summary())
+    timer.export(os.path.join(telemetry_path, "timing.json"))
+    print(f"Telemetry written to {telemetry_path}")
     plot = False
     if plot:
-        plot_graph(dt,logged_variables, "/home/kuns/stuffs/AI_lab/Fuzzy-CartPole/Images", "states.png",)
-    
\ No newline at end of file
+        plot_episode(telemetry_path, 0, "/home/kuns/stuffs/AI_lab/Fuzzy-CartPole/Images", "states.png")
+    
@@ -0,0 +1,175 @@
+import math
+import time
+import numpy as np
+import pygame
+
+from visualize import RealtimeCartPoleVisualizer
+
+
+class MultiCartPoleVisualizer(RealtimeCartPoleVisualizer):
+    '''
+    Shows N cart-poles at once, either overlaid on the main track with
+    translucency (layout="overlay") or tiled in a grid of small tracks
+    (layout="tiled").
+
+    Cart and pole sprites are pre-rendered, the pole for `angle_steps`
+    quantised angles, and all screen coordinates come from one vectorised
+    transform, so a frame is a single Surface.blits call. Frames are always
+    redrawn in full; with N carts moving the dirty area is most of the screen.
+    '''
+    def __init__(self, num_envs, layout="overlay", alpha=90, angle_steps=180, columns=None, **kwargs):
+        if kwargs.get("dirty_rects"):
+            raise ValueError("MultiCartPoleVisualizer does not support dirty_rects")
+        super().__init__(**kwargs)
+        if layout not in ("overlay", "tiled"):
+            raise ValueError(f"Unknown layout: {layout}")
+        self.num_envs = num_envs
+        self.layout = layout
+        self.angle_steps = angle_steps
+        self.info_font = pygame.font.Font(None, 24)
+
+        if layout == "overlay":
+            self.env_scale = self.scale
+            self.origin_x = np.full(num_envs, self.width // 2, dtype=float)
+            self.origin_y = np.full(num_envs, self.ground_y, dtype=float)
+            self.sprite_alpha = alpha
+        else:
+            ''' Grid of cells below the tabs, each with its own track'''
+            self.columns = columns or int(math.ceil(math.sqrt(num_envs)))
+            self.rows = int(math.ceil(num_envs / self.columns))
+            self.cell_width = self.width / self.columns
+            self.cell_height = (self.height - self.tab_height) / self.rows
+            self.env_scale = min(self.cell_width / 8.0, self.cell_height / (1.5 * self.pole_length_meters + 1.0))
+
+            cells = np.arange(num_envs)
+            self.origin_x = (cells % self.columns + 0.5) * self.cell_width
+            self.origin_y = self.tab_height + (cells // self.columns + 0.85) * self.cell_height
+            self.sprite_alpha = 255
+            self.grid_background = None
+            self.grid_background_key = None
+
+        self.build_sprites()
+
+    def world_to_screen_batch(self, x_pos):
+        ''' Vectorised world_to_screen for every environment at once'''
+        return self.origin_x + np.asarray(x_pos, dtype=float) * self.env_scale
+
+    def build_sprites(self):
+        cart_width = max(2, int(self.cart_width_meters * self.env_scale))
+        cart_height = max(2, int(self.cart_height_meters * self.env_scale))
+        pole_length = max(2, int(self.pole_length_meters * self.env_scale))
+        pole_width = max(1, int(self.pole_width * self.env_scale / self.scale))
+
+        self.cart_sprite = pygame.Surface((cart_width, cart_height), pygame.SRCALPHA)
+        self.cart_sprite.fill((255, 0, 255, self.sprite_alpha))
+        pygame.draw.rect(self.cart_sprite, (0, 0, 0, self.sprite_alpha), self.cart_sprite.get_rect(), max(1, cart_width // 50))
+        self.cart_sprite = self.cart_sprite.convert_alpha()
+        self.cart_offset = np.array([cart_width / 2, cart_height], dtype=float)
+        self.cart_half_height = cart_height // 2
+
+        ''' Upright pole on a square canvas centred on the pivot, rotated per quantised angle'''
+        side = 2 * pole_length + pole_width
+        upright = pygame.Surface((side, side), pygame.SRCALPHA)
+        pole_rect = pygame.Rect(0, 0, pole_width, pole_length)
+        pole_rect.midbottom = (side // 2, side // 2)
+        pygame.draw.rect(upright, (255, 255, 0, self.sprite_alpha), pole_rect)
+        pygame.draw.circle(upright, (0, 0, 0, self.sprite_alpha), (side // 2, side // 2), max(1, pole_width // 2 + 1))
+
+        self.pole_sprites = []
+        self.pole_offsets = np.zeros((self.angle_steps, 2), dtype=float)
+        for k in range(self.angle_steps):
+            angle = 360.0 * k / self.angle_steps
+            rotated = pygame.transform.rotate(upright, -angle)
+            ''' Crop to the visible pixels, keeping the offset from the pivot'''
+            bounds = rotated.get_bounding_rect()
+            sprite = rotated.subsurface(bounds).copy().convert_alpha()
+            self.pole_sprites.append(sprite)
+            self.pole_offsets[k] = (rotated.get_width() / 2 - bounds.x, rotated.get_height() / 2 - bounds.y)
+
+    def get_grid_background(self):
+        key = (self.is_night, self.screen.get_size())
+        if self.grid_background_key != key:
+            background = pygame.Surface(self.screen.get_size()).convert(self.screen)
+            background.fill(self.NIGHT_SKY if self.is_night else self.LIGHT_BLUE)
+            track_color = (100, 100, 100) if self.is_night else self.DARK_GRAY
+            for x, y in zip(self.origin_x, self.origin_y):
+                left = x - self.cell_width / 2
+                pygame.draw.line(background, track_color, (left + 4, y), (left + self.cell_width - 4, y), 2)
+            for c in range(1, self.columns):
+                pygame.draw.line(background, self.BLACK, (c * self.cell_width, self.tab_height), (c * self.cell_width, self.height), 1)
+            for r in range(1, self.rows):
+                y = self.tab_height + r * self.cell_height
+                pygame.draw.line(background, self.BLACK, (0, y), (self.width, y), 1)
+            self.grid_background = background
+            self.grid_background_key = key
+        return self.grid_background
+
+    def update(self, cart_positions, pole_angles, force_redraw=True, current_time=None):
+        if not self.handle_events():
+            return False
+        if current_time is None:
+            current_time = time.time() - self.start_time
+
+        cart_positions = np.asarray(cart_positions, dtype=float)
+        pole_angles = np.asarray(pole_angles, dtype=float)
+        ''' The base draw helpers collect rects here, only needed within one frame'''
+        self.frame_rects = []
+
+        if self.layout == "overlay":
+            self.screen.blit(self.get_background_cache(), (0, 0))
+            if self.is_night:
+                self.draw_stars(visible_only=True)
+            self.draw_slider_knob()
+        else:
+            self.screen.blit(self.get_grid_background(), (0, 0))
+
+        ''' All screen coordinates in one go'''
+        cart_x = self.world_to_screen_batch(cart_positions)
+        pivot_y = self.origin_y - self.cart_half_height
+        cart_pos = np.stack((cart_x - self.cart_offset[0], self.origin_y - self.cart_offset[1]), axis=1)
+
+        steps = np.rint(np.mod(pole_angles, 2 * math.pi) / (2 * math.pi) * self.angle_steps).astype(np.int64) % self.angle_steps
+        pole_pos = np.stack((cart_x, pivot_y), axis=1) - self.pole_offsets[steps]
+
+        cart_blits = zip([self.cart_sprite] * len(cart_x), cart_pos.tolist())
+        pole_blits = zip([self.pole_sprites[k] for k in steps.tolist()], pole_pos.tolist())
+        self.screen.blits(cart_blits, doreturn=False)
+        self.screen.blits(pole_blits, doreturn=False)
+
+        ''' Summary tab'''
+        upright = int(np.count_nonzero(np.abs(pole_angles) < math.pi / 2))
+        text_color = (200, 200, 255) if self.is_night else (50, 50, 50)
+        self.screen.blit(self.get_tab_background(), (0, 0))
+        summary = f"Time {current_time:.2f}s   Envs {len(cart_x)}   Upright {upright}"
+        self.screen.blit(self.text_cache.render(self.info_font, summary, text_color), (10, 30))
+
+        if force_redraw and not self.headless:
+            pygame.display.flip()
+            self.clock.tick(self.fps)
+
+        self.frame_count += 1
+        return True
+
+
+if __name__ == "__main__":
+    import argparse
+    from controller import build_fis
+    from closed_loop import FusedClosedLoop
+
+    parser = argparse.ArgumentParser(description="Watch a batch of fuzzy-controlled cart-poles")
+    parser.add_argument("--envs", type=int, default=64)
+    parser.add_argument("--layout", choices=["overlay", "tiled"], default="tiled")
+    args = parser.parse_args()
+
+    loop = FusedClosedLoop(build_fis().compile(), args.envs)
+    rng = np.random.default_rng(0)
+    initial = np.zeros((args.envs, 4))
+    initial[:, 3] = rng.uniform(-0.5, 0.5, size=args.envs)
+    loop.set_states(initial)
+
+    visualizer = MultiCartPoleVisualizer(args.envs, layout=args.layout, pole_length_meters=1.0)
+    while True:
+        states = loop.step(visualizer.get_target_position())
+        if not visualizer.update(states[:, 1], states[:, 3]):
+            break
+    visualizer.close()
@@ -0,0 +1,129 @@
+import time
+import threading
+import numpy as np
+
+from scheduler import interpolate_states
+
+'''
+Runs the simulation and controller on a worker thread, away from rendering.
+
+The worker publishes a snapshot after every batch of physics steps into a
+SeqlockState, and the render thread reads the latest one without taking a lock.
+The slider target travels the other way through a TargetSlot, so a slow frame
+never delays a controller update.
+'''
+
+''' Snapshot layout : previous states, states, accumulator, sim time, force, target, physics steps, publish time'''
+SNAPSHOT_SIZE = 14
+PREVIOUS = slice(0, 4)
+CURRENT = slice(4, 8)
+ACCUMULATOR, SIM_TIME, FORCE, TARGET, PHYSICS_STEPS, PUBLISHED_AT = range(8, 14)
+
+
+class SeqlockState:
+    '''
+    Single writer, many readers. The sequence number is odd while a write is in
+    progress; a reader copies the data and retries if the sequence was odd or
+    changed during the copy, so it never sees a half written snapshot.
+    '''
+    def __init__(self, size):
+        self.data = np.zeros(size, dtype=float)
+        self.sequence = 0
+        self.retries = 0
+
+    def write(self, values):
+        self.sequence += 1
+        self.data[:] = values
+        self.sequence += 1
+
+    def read(self, out=None):
+        if out is None:
+            out = np.empty_like(self.data)
+        while True:
+            before = self.sequence
+            if before & 1 == 0:
+                out[:] = self.data
+                if self.sequence == before:
+                    return out, before
+            self.retries += 1
+            time.sleep(0)
+
+
+class TargetSlot:
+    ''' Latest value wins; a single reference assignment, so no lock is needed'''
+    def __init__(self, value=0.0):
+        self.value = float(value)
+
+    def set(self, value):
+        self.value = float(value)
+
+    def get(self):
+        return self.value
+
+
+class SimulationThread(threading.Thread):
+    '''
+    Drives a MultiRateScheduler in real time on its own thread. on_physics_step
+    callbacks of the scheduler (e.g. telemetry) run on this thread, and with a
+    scheduler timer set each batch of steps is recorded as the "tick" phase.
+    '''
+    def __init__(self, scheduler, target=0.0):
+        super().__init__(name="cartpole-simulation", daemon=True)
+        self.scheduler = scheduler
+        self.target = TargetSlot(target)
+        self.shared = SeqlockState(SNAPSHOT_SIZE)
+        self.snapshot = np.zeros(SNAPSHOT_SIZE, dtype=float)
+        self.stop_event = threading.Event()
+        self.error = None
+        self.publish()
+
+    def publish(self):
+        scheduler = self.scheduler
+        sim = scheduler.simulation
+        snapshot = self.snapshot
+        snapshot[PREVIOUS] = scheduler.previous_states
+        snapshot[CURRENT] = sim.states
+        snapshot[ACCUMULATOR] = scheduler.accumulator
+        snapshot[SIM_TIME] = sim.time
+        snapshot[FORCE] = sim.force
+        snapshot[TARGET] = sim.target
+        snapshot[PHYSICS_STEPS] = sim.physics_steps
+        snapshot[PUBLISHED_AT] = time.perf_counter()
+        self.shared.write(snapshot)
+
+    def run(self):
+        scheduler = self.scheduler
+        physics_dt = scheduler.physics_dt
+        last = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                now = time.perf_counter()
+                tick_start = time.perf_counter_ns()
+                if scheduler.advance(now - last, self.target.get()):
+                    self.publish()
+                    if scheduler.timer is not None:
+                        scheduler.timer.record("tick", time.perf_counter_ns() - tick_start)
+                last = now
+                ''' Sleep until the next physics step is due'''
+                self.stop_event.wait(max(0.0, physics_dt - scheduler.accumulator))
+        except Exception as e:
+            print(f"Simulation thread stopped: {e}")
+            self.error = e
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        self.join(timeout)
+
+    def latest(self):
+        ''' Copy of the last published snapshot (render thread)'''
+        snapshot, _ = self.shared.read()
+        return snapshot
+
+    def interpolated_states(self, snapshot=None):
+        ''' Display state, extrapolating alpha by the time since the snapshot was published'''
+        if snapshot is None:
+            snapshot = self.latest()
+        physics_dt = self.scheduler.physics_dt
+        elapsed = time.perf_counter() - snapshot[PUBLISHED_AT]
+        alpha = min(1.0, (snapshot[ACCUMULATOR] + elapsed) / physics_dt)
+        return interpolate_states(snapshot[PREVIOUS], snapshot[CURRENT], alpha)
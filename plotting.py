@@ -0,0 +1,228 @@
+import os
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+'''
+Plots of logged runs that stay cheap for long and batched logs.
+
+Each channel is reduced to at most a few points per horizontal pixel before it
+reaches matplotlib, either with a min/max envelope (every spike survives) or
+with Largest-Triangle-Three-Buckets (LTTB, smoother, keeps the visual shape).
+Both read the channel in slices, so a memory-mapped log is never loaded whole.
+'''
+
+PLOT_FIGSIZE = (8, 12)
+BLOCK_ROWS = 1 << 20
+
+
+def bucket_edges(n, buckets):
+    return np.unique(np.linspace(0, n, buckets + 1).astype(np.int64))
+
+
+def minmax_envelope(y, buckets, block_rows=BLOCK_ROWS):
+    ''' Indices of the min and max sample of each bucket, in time order'''
+    n = len(y)
+    edges = bucket_edges(n, buckets)
+    selected = []
+    first = 0
+    while first < len(edges) - 1:
+        ''' A group of whole buckets spanning at most block_rows samples'''
+        last = max(first + 1, int(np.searchsorted(edges, edges[first] + block_rows, side="right")) - 1)
+        last = min(last, len(edges) - 1)
+        start, stop = edges[first], edges[last]
+        segment = np.asarray(y[start:stop], dtype=float)
+
+        starts = edges[first:last] - start
+        lengths = np.diff(edges[first:last + 1])
+        offsets = np.arange(lengths.max())
+        valid = offsets < lengths[:, None]
+        index = np.minimum(starts[:, None] + offsets, len(segment) - 1)
+        values = segment[index]
+        low = np.argmin(np.where(valid, values, np.inf), axis=1)
+        high = np.argmax(np.where(valid, values, -np.inf), axis=1)
+        pair = np.sort(np.stack((low, high), axis=1), axis=1)
+        selected.append((start + starts[:, None] + pair).ravel())
+        first = last
+    if not selected:
+        return np.zeros(0, dtype=np.int64)
+    return np.unique(np.concatenate(selected))
+
+
+def lttb(y, threshold, x=None):
+    ''' Largest-Triangle-Three-Buckets, returns the indices of `threshold` samples'''
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    if x is None:
+        x = lambda a, b : np.arange(a, b, dtype=float)
+    else:
+        x_values = x
+        x = lambda a, b : np.asarray(x_values[a:b], dtype=float)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.zeros(threshold, dtype=np.int64)
+    selected[-1] = n - 1
+    a = 0
+    a_x, a_y = x(0, 1)[0], float(y[0])
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        ''' Average of the next bucket (the last point for the final bucket)'''
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        c_x = x(stop, next_stop).mean()
+        c_y = np.asarray(y[stop:next_stop], dtype=float).mean()
+
+        b_x = x(start, stop)
+        b_y = np.asarray(y[start:stop], dtype=float)
+        area = np.abs((a_x - c_x) * (b_y - a_y) - (a_x - b_x) * (c_y - a_y))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+        a_x, a_y = b_x[a - start], b_y[a - start]
+    return selected
+
+
+def downsample(y, max_points, method="minmax"):
+    ''' Indices of the samples to draw, all of them when the channel is short enough'''
+    n = len(y)
+    if max_points is None or n <= max_points:
+        return np.arange(n)
+    if method == "minmax":
+        return minmax_envelope(y, max(1, max_points // 2))
+    if method == "lttb":
+        return lttb(y, max_points)
+    raise ValueError(f"Unknown downsampling method: {method}")
+
+
+def plot_graph(dt, lv, dir_path, filename, show_img=False, dpi=600, fmt=None, max_points=None, method="minmax"):
+    '''
+    lv : the six PLOT_CHANNELS rows, either a (6, N) array or a sequence of
+    per-channel arrays (e.g. memmap column views). max_points defaults to two
+    points per horizontal pixel of the saved figure.
+    '''
+    if dir_path is None:
+        raise ValueError("Output directory path not provided")
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import MaxNLocator
+
+    os.makedirs(dir_path, exist_ok=True)
+    if max_points is None:
+        max_points = 2 * int(PLOT_FIGSIZE[0] * dpi)
+
+    def series(row, scale=None):
+        idx = downsample(lv[row], max_points, method)
+        values = np.asarray(lv[row][idx], dtype=float)
+        return idx * dt, (values if scale is None else scale(values))
+
+    force      = series(0)
+    target     = series(1)
+    car_vel    = series(2)
+    car_pos    = series(3)
+    pole_vel   = series(4)
+    pole_angle = series(5, np.degrees)
+
+    # create "grid" layout for subplots
+    fig = plt.figure(figsize=PLOT_FIGSIZE)
+
+    # --- Plot 1: Force ---
+    ax1 = plt.subplot2grid((5,1), (0,0))
+    ax1.plot(*force, color='tab:blue')
+    ax1.set_ylabel('Force (N)')
+    ax1.set_title('Force vs Time')
+    ax1.grid(True)
+    ax1.xaxis.set_major_locator(MaxNLocator(nbins=10))
+    ax1.yaxis.set_major_locator(MaxNLocator(nbins=10))
+
+    # --- Plot 2: Target & Cart Position ---
+    ax2 = plt.subplot2grid((5,1), (1,0))
+    ax2.plot(*target, label="Target", color='tab:red')
+    ax2.plot(*car_pos, label="Cart Position", color='tab:orange')
+    ax2.set_ylabel('Position (m)')
+    ax2.set_title('Target & Cart Position vs Time')
+    ax2.legend()
+    ax2.grid(True)
+    ax2.xaxis.set_major_locator(MaxNLocator(nbins=10))
+    ax2.yaxis.set_major_locator(MaxNLocator(nbins=10))
+
+    # --- Plot 3a: Car Velocity ---
+    ax3 = plt.subplot2grid((5,1), (2,0))
+    ax3.plot(*car_vel, color='tab:blue')
+    ax3.set_ylabel('Car Vel (m/s)')
+    ax3.grid(True)
+
+    # --- Plot 3b: Pole Velocity ---
+    ax4 = plt.subplot2grid((5,1), (3,0))
+    ax4.plot(*pole_vel, color='tab:green')
+    ax4.set_ylabel('Pole Vel (rad/s)')
+    ax4.grid(True)
+
+    # --- Plot 3c: Pole Angle ---
+    ax5 = plt.subplot2grid((5,1), (4,0))
+    ax5.plot(*pole_angle, color='tab:purple')
+    ax5.set_ylabel('Pole Angle (deg)')
+    ax5.set_xlabel('Time (s)')
+    ax5.grid(True)
+
+    plt.tight_layout()
+    plt.savefig(f"{dir_path}/{filename}", dpi=dpi, format=fmt)
+
+    if show_img:
+        plt.show()
+    else:
+        plt.close(fig)
+
+
+def plot_episode(store_path, episode, dir_path, filename=None, dpi=600, fmt="png", max_points=None, method="minmax"):
+    ''' Plot one episode of a trajectory store, reading its channels lazily'''
+    from trajectory_store import TrajectoryStore, PLOT_CHANNELS
+
+    store = TrajectoryStore(store_path)
+    lv = [store.episode(episode, channel) for channel in PLOT_CHANNELS]
+    if filename is None:
+        filename = f"episode_{int(episode):05d}.{fmt}"
+    plot_graph(store.dt, lv, dir_path, filename, dpi=dpi, fmt=fmt, max_points=max_points, method=method)
+    return os.path.join(dir_path, filename)
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def plot_store(store_path, dir_path, episodes=None, workers=None, dpi=150, fmt="png", max_points=None, method="minmax"):
+    ''' One figure per episode, rendered in a process pool. Returns the written paths'''
+    from trajectory_store import TrajectoryStore
+
+    if episodes is None:
+        episodes = [int(e) for e in TrajectoryStore(store_path).episode_ids]
+    os.makedirs(dir_path, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(episodes) == 1:
+        ''' Not worth starting processes for'''
+        _init_worker()
+        return [plot_episode(store_path, episode, dir_path, None, dpi, fmt, max_points, method) for episode in episodes]
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        futures = [pool.submit(plot_episode, store_path, episode, dir_path, None, dpi, fmt, max_points, method)
+                   for episode in episodes]
+        return [future.result() for future in futures]
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Plot the episodes of a trajectory store")
+    parser.add_argument("store")
+    parser.add_argument("out_dir")
+    parser.add_argument("--episodes", type=int, nargs="+", default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--format", default="png", help="Any matplotlib output format, e.g. png, svg, pdf")
+    parser.add_argument("--max-points", type=int, default=None, help="Points per channel, default two per pixel column")
+    parser.add_argument("--method", choices=["minmax", "lttb"], default="minmax")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    paths = plot_store(args.store, args.out_dir, args.episodes, args.workers, args.dpi, args.format, args.max_points, args.method)
+    print(f"Wrote {len(paths)} figures to {args.out_dir} in {time.perf_counter() - start:.1f}s")
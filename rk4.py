@@ -1,3 +1,5 @@
+import numpy as np
+
 def rk4( f, y, dt):
     k1 = f(y)
     k2 = f(y + k1 * dt * 0.5)
@@ -5,4 +7,29 @@ def rk4( f, y, dt):
     k4 = f(y + k3 * dt)
     
     y_dt = y + dt * (k1 + 2*k2 + 2*k3 + k4)/6
-    return y_dt
\ No newline at end of file
+    return y_dt
+
+def rk4_inplace(f, y, dt, k, y_tmp):
+    ''' 
+    rk4 step that overwrites y. f(y, out) writes the derivative into out,
+    k is a (4, *y.shape) scratch array and y_tmp has the shape of y.
+    '''
+    f(y, k[0])
+    np.multiply(k[0], dt * 0.5, out=y_tmp)
+    y_tmp += y
+    f(y_tmp, k[1])
+    np.multiply(k[1], dt * 0.5, out=y_tmp)
+    y_tmp += y
+    f(y_tmp, k[2])
+    np.multiply(k[2], dt, out=y_tmp)
+    y_tmp += y
+    f(y_tmp, k[3])
+
+    k[1] *= 2
+    k[2] *= 2
+    k[0] += k[1]
+    k[0] += k[2]
+    k[0] += k[3]
+    k[0] *= dt / 6
+    y += k[0]
+    return y
@@ -0,0 +1,162 @@
+import math
+import numpy as np
+
+from closed_loop import FusedClosedLoop
+
+''' Episode outcomes'''
+TIMEOUT = 0
+FAILED = 1
+SETTLED = 2
+
+
+def batched_rollout(controller, init_states, horizon, dt=0.05, target=0.0,
+                    theta_limit=math.pi/2, x_limit=5.0, settle_tol=1e-3, settle_steps=20,
+                    cart_mass=1, pole_mass=0.1, pole_length=1, loop=None, dtype=np.float64):
+    '''
+    Closed-loop rollouts of many episodes with early termination.
+
+    After every step, episodes whose pole fell or cart left the track (FAILED) and
+    episodes that stayed within `settle_tol` of the target for `settle_steps`
+    steps (SETTLED) are retired. The remaining rows are compacted into a dense
+    prefix of the state arrays, so later steps only integrate live episodes.
+    `episode_ids` maps each live row back to its index in `init_states`.
+
+    Returns a dict of per-episode arrays : outcome, steps, final_states, and the
+    number of live episodes at every step in live_counts. dtype is the precision
+    of the closed loop when no loop is given.
+    '''
+    init_states = np.asarray(init_states, dtype=float)
+    num_episodes = init_states.shape[0]
+
+    if loop is None:
+        loop = FusedClosedLoop(controller, num_episodes, dt, cart_mass, pole_mass, pole_length, dtype=dtype)
+    loop.set_states(init_states)
+
+    episode_ids = np.arange(num_episodes)
+    targets = np.broadcast_to(np.asarray(target, dtype=float), (num_episodes,)).copy()
+    calm_steps = np.zeros(num_episodes, dtype=np.int64)
+
+    outcome = np.full(num_episodes, TIMEOUT, dtype=np.int8)
+    steps = np.full(num_episodes, horizon, dtype=np.int64)
+    final_states = np.zeros((num_episodes, 4), dtype=float)
+    live_counts = []
+
+    for t in range(horizon):
+        n = loop.n_active
+        if n == 0:
+            break
+        live_counts.append(n)
+
+        states = loop.step(targets[:n])
+
+        failed = np.abs(states[:, 3]) > theta_limit
+        failed |= np.abs(states[:, 1]) > x_limit
+
+        ''' Distance to the upright equilibrium at the target'''
+        error = np.abs(states[:, 0])
+        np.maximum(error, np.abs(states[:, 1] - targets[:n]), out=error)
+        np.maximum(error, np.abs(states[:, 2]), out=error)
+        np.maximum(error, np.abs(states[:, 3]), out=error)
+        calm = calm_steps[:n]
+        calm += 1
+        calm[error > settle_tol] = 0
+        settled = calm >= settle_steps
+
+        finished = failed | settled
+        if not finished.any():
+            continue
+
+        done_rows = np.flatnonzero(finished)
+        done_ids = episode_ids[done_rows]
+        outcome[done_ids] = np.where(failed[done_rows], FAILED, SETTLED)
+        steps[done_ids] = t + 1
+        final_states[done_ids] = states[done_rows]
+
+        ''' Compact the live rows into a dense prefix'''
+        live_rows = np.flatnonzero(~finished)
+        n_live = live_rows.size
+        loop.states[:n_live] = states[live_rows]
+        episode_ids[:n_live] = episode_ids[live_rows]
+        targets[:n_live] = targets[live_rows]
+        calm_steps[:n_live] = calm[live_rows]
+        loop.n_active = n_live
+
+    ''' Episodes that ran to the horizon'''
+    n = loop.n_active
+    final_states[episode_ids[:n]] = loop.states[:n]
+
+    return {
+        "outcome": outcome,
+        "steps": steps,
+        "final_states": final_states,
+        "live_counts": np.array(live_counts, dtype=np.int64),
+    }
+
+
+_worker_controller = None
+
+
+def _attach_controller(handle):
+    global _worker_controller
+    from fuzzy.compiled import CompiledFIS
+    _worker_controller = CompiledFIS.from_shared(handle)
+
+
+def _rollout_chunk(init_states, horizon, kwargs):
+    return batched_rollout(_worker_controller, init_states, horizon, **kwargs)
+
+
+def parallel_rollout(controller, init_states, horizon, workers=None, chunks=None, **kwargs):
+    '''
+    batched_rollout split across worker processes. The compiled controller is
+    published once in shared memory and every worker attaches to it, so the
+    tables are not copied per worker. Takes the same keyword arguments as
+    batched_rollout (except loop) and returns the same dict.
+    '''
+    import os
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    init_states = np.asarray(init_states, dtype=float)
+    workers = workers or os.cpu_count() or 1
+    parts = np.array_split(init_states, min(chunks or workers, len(init_states)))
+
+    chunk_kwargs = [dict(kwargs) for _ in parts]
+    target = np.asarray(kwargs.get("target", 0.0), dtype=float)
+    if target.ndim:
+        for part_kwargs, part_target in zip(chunk_kwargs, np.array_split(target, len(parts))):
+            part_kwargs["target"] = part_target
+
+    with controller.share() as tables:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_attach_controller, initargs=(tables.handle,)) as pool:
+            results = list(pool.map(_rollout_chunk, parts, [horizon] * len(parts), chunk_kwargs))
+
+    live_counts = np.zeros(max(len(r["live_counts"]) for r in results), dtype=np.int64)
+    for r in results:
+        live_counts[:len(r["live_counts"])] += r["live_counts"]
+    return {
+        "outcome": np.concatenate([r["outcome"] for r in results]),
+        "steps": np.concatenate([r["steps"] for r in results]),
+        "final_states": np.concatenate([r["final_states"] for r in results]),
+        "live_counts": live_counts,
+    }
+
+
+if __name__ == "__main__":
+    import time
+    from controller import build_fis
+
+    controller = build_fis().compile()
+    rng = np.random.default_rng(0)
+    init_states = np.zeros((512, 4))
+    init_states[:, 3] = rng.uniform(-1.0, 1.0, size=512)
+
+    start = time.perf_counter()
+    result = batched_rollout(controller, init_states, horizon=400)
+    elapsed = time.perf_counter() - start
+
+    print(f"Failed: {(result['outcome'] == FAILED).sum()}  "
+          f"Settled: {(result['outcome'] == SETTLED).sum()}  "
+          f"Timeout: {(result['outcome'] == TIMEOUT).sum()}")
+    print(f"Env steps integrated: {result['live_counts'].sum()} of {512 * 400}  in {elapsed:.2f}s")
@@ -0,0 +1,80 @@
+import os
+import threading
+
+
+def read_rules(path):
+    ''' One rule per line, blank lines and lines starting with # are ignored'''
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def write_rules(path, rules):
+    with open(path, "w") as f:
+        f.write("# One rule per line, rule i drives output membership function i\n")
+        for r in rules:
+            f.write(r + "\n")
+
+
+class RuleFileWatcher(threading.Thread):
+    '''
+    Watches a rule file and hot-swaps the controller when it changes.
+
+    On a change only the new rule lines are parsed, the rule plan is rebuilt on top
+    of the current compiled tables (CompiledFIS.with_rules) and the new engine is
+    handed to `publish`. Publishing is a single reference assignment, e.g. setting
+    CartPoleSimulation.fis, so the control loop keeps running and picks the new
+    plan up at its next tick. A file that does not parse or compile is reported
+    and the running plan is kept.
+    '''
+    def __init__(self, path, fis, compiled, publish, interval=0.5):
+        super().__init__(name="rule-reload", daemon=True)
+        self.path = path
+        self.fis = fis
+        self.compiled = compiled
+        self.publish = publish
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.reloads = 0
+        self.last_signature = self.signature()
+
+    def signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def reload(self):
+        rules = read_rules(self.path)
+        if rules == self.fis.ruleHndl.rules:
+            return False
+
+        previous = list(self.fis.ruleHndl.rules)
+        try:
+            self.fis.set_rules(rules)
+            compiled = self.compiled.with_rules(self.fis)
+        except (ValueError, KeyError, IndexError) as e:
+            print(f"Rule reload failed, keeping the running rules: {e}")
+            self.fis.set_rules(previous)
+            return False
+
+        self.compiled = compiled
+        self.publish(compiled)
+        self.reloads += 1
+        print(f"Reloaded {len(rules)} rules from {self.path}")
+        return True
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            signature = self.signature()
+            if signature is None or signature == self.last_signature:
+                continue
+            self.last_signature = signature
+            try:
+                self.reload()
+            except OSError as e:
+                print(f"Could not read {self.path}: {e}")
+
+    def stop(self, timeout=None):
+        self.stop_event.set()
+        self.join(timeout)
@@ -0,0 +1,87 @@
+import time
+
+from cartpole import wrap_angle
+
+
+def interpolate_states(previous, current, alpha):
+    ''' Blend two states, the wrapped angle along the short way round'''
+    states = previous + (current - previous) * alpha
+    angle_step = wrap_angle(current[3] - previous[3])
+    states[3] = wrap_angle(previous[3] + angle_step * alpha)
+    return states
+
+
+class MultiRateScheduler:
+    '''
+    Fixed-timestep scheduler for a CartPoleSimulation.
+
+    Wall time is added to an accumulator and consumed in fixed physics steps, the
+    controller runs every `control_ratio` physics steps, and the leftover fraction
+    of a physics step is used to interpolate the state shown by the renderer. The
+    render rate itself is whatever the caller paces frames at (the visualizer fps).
+    '''
+    def __init__(self, simulation, physics_hz=20.0, control_hz=20.0, max_frame_time=0.25):
+        if control_hz > physics_hz:
+            raise ValueError("Controller rate cannot be higher than the physics rate")
+        self.simulation = simulation
+        self.physics_hz = physics_hz
+        self.control_hz = control_hz
+        self.physics_dt = 1.0 / physics_hz
+        self.control_ratio = max(1, int(round(physics_hz / control_hz)))
+        self.max_frame_time = max_frame_time
+
+        self.accumulator = 0.0
+        self.previous_states = simulation.states.copy()
+        self.alpha = 0.0
+        self.on_physics_step = None
+        self.dropped_time = 0.0
+        ''' Optional InputLog (checkpoint.py), records the target every control step consumed'''
+        self.input_log = None
+        ''' Optional LoopTimer, records the "compute" and "integrate" phases'''
+        self.timer = None
+
+    def advance(self, wall_dt, target):
+        ''' Run every physics and control step that fits in wall_dt, return how many physics steps ran'''
+        if wall_dt > self.max_frame_time:
+            ''' After a stall, drop time instead of trying to catch up all at once'''
+            self.dropped_time += wall_dt - self.max_frame_time
+            wall_dt = self.max_frame_time
+        self.accumulator += wall_dt
+
+        steps = 0
+        while self.accumulator >= self.physics_dt:
+            ''' Consume the step first, so on_physics_step (e.g. a snapshot) sees the time still owed'''
+            self.accumulator -= self.physics_dt
+            self.step(target)
+            steps += 1
+
+        self.alpha = self.accumulator / self.physics_dt
+        return steps
+
+    def step(self, target):
+        '''
+        One physics step, preceded by a controller update when one is due. Depends
+        only on the simulation state and `target`, never on wall time, so a replay
+        feeding the same targets reproduces the run exactly.
+        '''
+        sim = self.simulation
+        timer = self.timer
+        clock = time.perf_counter_ns
+        if sim.physics_steps % self.control_ratio == 0:
+            if self.input_log is not None:
+                self.input_log.record(sim.physics_steps, target)
+            t0 = clock()
+            sim.control_step(target)
+            if timer is not None:
+                timer.record("compute", clock() - t0)
+        self.previous_states = sim.states.copy()
+        t0 = clock()
+        sim.physics_step(self.physics_dt)
+        if timer is not None:
+            timer.record("integrate", clock() - t0)
+        if self.on_physics_step is not None:
+            self.on_physics_step(sim)
+
+    def interpolated_states(self):
+        ''' State between the last two physics steps, for display'''
+        return interpolate_states(self.previous_states, self.simulation.states, self.alpha)
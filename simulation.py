@@ -0,0 +1,57 @@
+import numpy as np
+
+from cartpole import cartople, wrap_angle
+from rk4 import rk4
+
+
+class CartPoleSimulation:
+    '''
+    Plant state, controller output and simulated time of one cart-pole.
+
+    control_step runs the fuzzy controller on the current state, physics_step
+    integrates the plant with the last force held constant (zero-order hold),
+    so the two can run at different rates. `fis` is read once per control step,
+    so another thread may swap in a new controller at any time.
+    '''
+    def __init__(self, fis, cart_mass=1, pole_mass=0.1, pole_length=1, g=9.8, states=None):
+        self.fis = fis
+        self.cart_mass = cart_mass
+        self.pole_mass = pole_mass
+        self.pole_length = pole_length
+        self.g = g
+        self.plant = cartople(cart_mass, pole_mass, pole_length)
+
+        ''' states : x_dot, x, w_dot, w'''
+        self.states = np.array([0.0, 0.0, 0.0, 0.0] if states is None else states, dtype=float)
+        self.force = 0.0
+        self.target = 0.0
+        self.time = 0.0
+        self.physics_steps = 0
+        self.control_steps = 0
+
+    def control_step(self, target):
+        self.target = target
+        states = self.states
+        outputs = self.fis.compute([states[3], states[2], (target - states[1]), states[0]])
+        self.force = outputs[0]
+        self.control_steps += 1
+        return self.force
+
+    def physics_step(self, dt):
+        force = self.force
+        fn = lambda y : self.plant(y, force, self.g)
+        self.states = rk4(fn, self.states, dt)
+        self.states[3] = wrap_angle(self.states[3])
+        self.time += dt
+        self.physics_steps += 1
+        return self.states
+
+    def step(self, target, dt):
+        ''' One controller update followed by one integration step'''
+        self.control_step(target)
+        return self.physics_step(dt)
+
+    def log_row(self):
+        ''' Row in the PLOT_CHANNELS layout'''
+        x_dot, x, w_dot, w = self.states
+        return (self.force, self.target, x_dot, x, w_dot, w)
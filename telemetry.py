@@ -0,0 +1,145 @@
+import os
+import json
+import queue
+import threading
+import numpy as np
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_HEADER_LEN = 128  # fixed, so the row count can be rewritten in place
+
+
+def write_npy_header(f, dtype, shape):
+    ''' Write a fixed size .npy (v1.0) header at the start of f'''
+    header = "{'descr': %r, 'fortran_order': False, 'shape': %r, }" % (np.dtype(dtype).str, tuple(shape))
+    header = header.ljust(NPY_HEADER_LEN - len(NPY_MAGIC) - 2 - 1) + "\n"
+    if len(header) + len(NPY_MAGIC) + 2 != NPY_HEADER_LEN:
+        raise ValueError(f"Shape {shape} does not fit in the .npy header")
+    f.seek(0)
+    f.write(NPY_MAGIC)
+    f.write(np.uint16(len(header)).tobytes())
+    f.write(header.encode("latin1"))
+
+
+def schema_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+class TelemetryWriter:
+    '''
+    Append-only telemetry log with constant memory use.
+
+    Rows are buffered into fixed size NumPy chunks. Full chunks are handed to a
+    background thread that appends them to a .npy file and then rewrites the row
+    count in its header, so the file on disk is always a valid array holding every
+    flushed row. Channel names, units and any extra metadata go to a .json sidecar.
+    Read it back with `open_telemetry`.
+    '''
+    def __init__(self, path, channels, units=None, chunk_size=1024, dtype=float,
+                 metadata=None, num_buffers=4, fsync=False):
+        self.path = path
+        self.channels = list(channels)
+        self.units = list(units) if units is not None else [""] * len(self.channels)
+        self.chunk_size = chunk_size
+        self.dtype = np.dtype(dtype)
+        self.fsync = fsync
+        self.rows_written = 0
+
+        dir_path = os.path.dirname(path)
+        if dir_path:
+            os.makedirs(dir_path, exist_ok=True)
+
+        schema = {
+            "channels": self.channels,
+            "units": self.units,
+            "dtype": self.dtype.str,
+            "chunk_size": chunk_size,
+            "metadata": metadata or {},
+        }
+        with open(schema_path(path), "w") as f:
+            json.dump(schema, f, indent=2)
+
+        self.file = open(path, "w+b")
+        write_npy_header(self.file, self.dtype, (0, len(self.channels)))
+        self.file.flush()
+
+        ''' Chunk pool : the writer thread hands buffers back once they are on disk'''
+        self.free = queue.Queue()
+        for _ in range(num_buffers - 1):
+            self.free.put(np.zeros((chunk_size, len(self.channels)), dtype=self.dtype))
+        self.pending = queue.Queue()
+        self.buffer = np.zeros((chunk_size, len(self.channels)), dtype=self.dtype)
+        self.fill = 0
+        self.error = None
+
+        self.thread = threading.Thread(target=self._writer, name="telemetry-writer", daemon=True)
+        self.thread.start()
+
+    def _writer(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                self.pending.task_done()
+                return
+            buffer, rows = item
+            try:
+                self.file.seek(0, os.SEEK_END)
+                self.file.write(buffer[:rows].tobytes())
+                self.file.flush()
+                self.on_chunk(self.rows_written, buffer[:rows])
+                self.rows_written += rows
+                write_npy_header(self.file, self.dtype, (self.rows_written, len(self.channels)))
+                self.file.flush()
+                if self.fsync:
+                    os.fsync(self.file.fileno())
+            except Exception as e:
+                self.error = e
+            self.free.put(buffer)
+            self.pending.task_done()
+
+    def on_chunk(self, start, rows):
+        ''' Called from the writer thread with each chunk, before the header is updated'''
+        pass
+
+    def _submit(self):
+        if self.error is not None:
+            raise self.error
+        if self.fill == 0:
+            return
+        self.pending.put((self.buffer, self.fill))
+        self.buffer = self.free.get()
+        self.fill = 0
+
+    def append(self, row):
+        self.buffer[self.fill] = row
+        self.fill += 1
+        if self.fill == self.chunk_size:
+            self._submit()
+
+    def flush(self):
+        ''' Write the partial chunk and wait until everything is on disk'''
+        self._submit()
+        self.pending.join()
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.pending.put(None)
+        self.thread.join()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_telemetry(path):
+    ''' Memory-mapped (rows, channels) array and schema of a telemetry log'''
+    with open(schema_path(path)) as f:
+        schema = json.load(f)
+    data = np.load(path, mmap_mode="r")
+    return data, schema
@@ -0,0 +1,52 @@
+import numpy as np
+
+from controller import build_fis
+from simulation import CartPoleSimulation
+from scheduler import MultiRateScheduler
+from checkpoint import InputLog, Snapshot, replay
+
+
+def live_scheduler():
+    simulation = CartPoleSimulation(build_fis().compile(), states=[0.0, 0.0, 0.0, 0.1])
+    scheduler = MultiRateScheduler(simulation, 200, 50)
+    scheduler.input_log = InputLog()
+    return scheduler
+
+
+def test_restore_runs_the_same_steps_as_the_live_run():
+    scheduler = live_scheduler()
+    captured = []
+    scheduler.on_physics_step = lambda sim : captured.append(Snapshot.capture(scheduler))
+
+    rng = np.random.default_rng(0)
+    frames = rng.uniform(0.004, 0.03, size=60)
+    for wall_dt in frames[:30]:
+        scheduler.advance(wall_dt, 0.5)
+
+    ''' The snapshot from the last step of a frame resumes exactly where the frame ended'''
+    restored = captured[-1].restore()
+    assert restored.accumulator == scheduler.accumulator
+    assert restored.advance(0.0, 0.5) == 0
+
+    for wall_dt in frames[30:]:
+        assert restored.advance(wall_dt, 0.5) == scheduler.advance(wall_dt, 0.5)
+    assert np.array_equal(restored.simulation.states, scheduler.simulation.states)
+    assert restored.simulation.physics_steps == scheduler.simulation.physics_steps
+
+
+def test_replay_from_saved_snapshot_is_bit_exact(tmp_path):
+    scheduler = live_scheduler()
+    path = tmp_path / "mid.snap"
+    scheduler.on_physics_step = lambda sim : Snapshot.capture(scheduler).save(path) if sim.physics_steps == 400 else None
+
+    rng = np.random.default_rng(1)
+    target = 0.0
+    for _ in range(400):
+        if rng.random() < 0.05:
+            target = float(rng.uniform(-2, 2))
+        scheduler.advance(float(rng.uniform(0.005, 0.03)), target)
+
+    final = Snapshot.capture(scheduler)
+    replayed = replay(Snapshot.load(path), final.events, final.physics_steps).simulation
+    assert np.array_equal(replayed.states, scheduler.simulation.states)
+    assert replayed.force == scheduler.simulation.force
@@ -0,0 +1,47 @@
+import asyncio
+import json
+import numpy as np
+
+from controller import build_fis
+from control_server import (ControlServer, FRAME, COMPUTE, RESULT, ERROR, METRICS, METRICS_REPLY,
+                            encode_frame, read_frame)
+
+
+async def exchange(frames):
+    ''' Send each frame on one connection and collect one reply per frame'''
+    server = ControlServer(build_fis().compile())
+    await server.start()
+    host, port = server.address[:2]
+    reader, writer = await asyncio.open_connection(host, port)
+    replies = []
+    try:
+        for frame in frames:
+            writer.write(frame)
+            await writer.drain()
+            replies.append(await asyncio.wait_for(read_frame(reader), 5))
+    finally:
+        writer.close()
+        await server.close()
+    return replies, server
+
+
+def test_bad_header_gets_an_error_reply():
+    replies, server = asyncio.run(exchange([FRAME.pack(COMPUTE, 7, 0xFFFFFFFF, 4)]))
+    kind, request_id, payload = replies[0]
+    assert (kind, request_id) == (ERROR, 7)
+    assert b"rows per request" in payload
+    assert server.errors == 1
+
+
+def test_bad_metrics_body_gets_an_error_reply_and_keeps_the_connection():
+    inputs = np.array([[0.1, 0.0, 0.0, 0.0]])
+    replies, server = asyncio.run(exchange([
+        encode_frame(METRICS, 1, payload=b"{bad"),
+        encode_frame(METRICS, 2, payload=b"[1]"),
+        encode_frame(COMPUTE, 3, inputs),
+        encode_frame(METRICS, 4, payload=json.dumps({"reset": True}).encode()),
+    ]))
+    assert [(kind, request_id) for kind, request_id, _ in replies] == \
+        [(ERROR, 1), (ERROR, 2), (RESULT, 3), (METRICS_REPLY, 4)]
+    assert np.allclose(replies[2][2], build_fis().compile().compute_batch(inputs))
+    assert json.loads(replies[3][2])["errors"] == 2
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from controller import build_fis
+
+
+INPUTS = [[0.3, -1.0, 0.5, 0.2], [-0.8, 2.0, -1.5, -0.4], [0.05, 0.1, 0.0, 0.0]]
+
+
+def reference(fis):
+    return np.array([fis.compute(list(x))[0] for x in INPUTS])
+
+
+def test_add_remove_set_rules_round_trip():
+    fis = build_fis()
+    rules = list(fis.ruleHndl.rules)
+    expected = reference(fis)
+    compiled = fis.compile()
+
+    fis.remove_rule(rules[6])
+    fis.remove_rule(6)
+    assert fis.ruleHndl.rules == rules[:6]
+    compiled = compiled.with_rules(fis)
+    ''' fuzzy.compute needs a rule per output MF, so compare with a full compile here'''
+    assert np.array_equal(compiled.compute_batch(INPUTS), fis.compile().compute_batch(INPUTS))
+
+    fis.add_rule(rules[6:])
+    assert fis.ruleHndl.rules == rules
+    compiled = compiled.with_rules(fis)
+    assert np.allclose(reference(fis), expected)
+    assert np.allclose(compiled.compute_batch(INPUTS)[:, 0], expected)
+
+    ''' Reordered rules drive other output MFs; the incremental engine must follow'''
+    changed = rules[::-1]
+    changed[0] = "If Theta is Negative and Theta_dot is Positive Then Force is NM"
+    fis.set_rules(changed)
+    compiled = compiled.with_rules(fis)
+    assert np.allclose(compiled.compute_batch(INPUTS), fis.compile().compute_batch(INPUTS))
+    assert np.allclose(compiled.compute_batch(INPUTS)[:, 0], reference(fis))
+
+
+def test_remove_rule_rejects_unknown_rules():
+    fis = build_fis()
+    count = len(fis.ruleHndl.rules)
+    for bad in ("If Theta is Sideways Then Force is NM", count, -1, True, [0, "typo"]):
+        with pytest.raises((ValueError, IndexError)):
+            fis.remove_rule(bad)
+    assert len(fis.ruleHndl.rules) == count
@@ -0,0 +1,251 @@
+import os
+import time
+import numpy as np
+
+from telemetry import TelemetryWriter, open_telemetry
+
+'''
+A trajectory store is a directory of append-only .npy files :
+    data.npy      (rows, channels) samples of every episode back to back
+    data.json     channel names, units and metadata (dt, plant parameters ...)
+    episodes.npy  (episodes, 3) int64 : episode id, first row, end row
+    chunks.npy    (chunks, 2 + 2*channels) : first row, end row, per channel min, per channel max
+All of them are read back through np.memmap, so slicing never loads the whole store.
+'''
+
+DATA_FILE = "data.npy"
+EPISODES_FILE = "episodes.npy"
+CHUNKS_FILE = "chunks.npy"
+
+''' Channel names used by main.py, in the order plot_graph expects them'''
+PLOT_CHANNELS = ["force", "target", "cart_vel", "cart_pos", "pole_vel", "pole_angle"]
+
+
+class _SummarizedWriter(TelemetryWriter):
+    ''' Telemetry writer that also logs a min/max summary of every chunk'''
+    def __init__(self, path, channels, chunk_log, **kwargs):
+        self.chunk_log = chunk_log
+        super().__init__(path, channels, **kwargs)
+
+    def on_chunk(self, start, rows):
+        summary = np.concatenate(([start, start + len(rows)], rows.min(axis=0), rows.max(axis=0)))
+        self.chunk_log.append(summary)
+
+
+class TrajectoryStoreWriter:
+    def __init__(self, path, channels, units=None, chunk_size=1024, metadata=None, fsync=False):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        channels = list(channels)
+        self.episode_log = TelemetryWriter(os.path.join(path, EPISODES_FILE),
+                                           ["episode_id", "start", "stop"], dtype=np.int64,
+                                           chunk_size=64, fsync=fsync)
+        self.chunk_log = TelemetryWriter(os.path.join(path, CHUNKS_FILE),
+                                         ["start", "stop"] + [f"min_{c}" for c in channels] + [f"max_{c}" for c in channels],
+                                         chunk_size=64, fsync=fsync)
+        self.data = _SummarizedWriter(os.path.join(path, DATA_FILE), channels, self.chunk_log,
+                                      units=units, chunk_size=chunk_size, metadata=metadata, fsync=fsync)
+
+        self.rows = 0
+        self.episode_id = None
+        self.episode_start = 0
+        self.next_episode_id = 0
+
+    def begin_episode(self, episode_id=None):
+        if self.episode_id is not None:
+            self.end_episode()
+        if episode_id is None:
+            episode_id = self.next_episode_id
+        self.episode_id = episode_id
+        self.next_episode_id = episode_id + 1
+        self.episode_start = self.rows
+
+    def append(self, row):
+        if self.episode_id is None:
+            self.begin_episode()
+        self.data.append(row)
+        self.rows += 1
+
+    def append_episode(self, rows, episode_id=None):
+        ''' Append a whole (steps, channels) episode at once'''
+        self.begin_episode(episode_id)
+        for row in rows:
+            self.append(row)
+        self.end_episode()
+
+    def end_episode(self):
+        if self.episode_id is None:
+            return
+        self.episode_log.append((self.episode_id, self.episode_start, self.rows))
+        self.episode_id = None
+
+    def flush(self):
+        self.data.flush()
+        self.chunk_log.flush()
+        self.episode_log.flush()
+
+    def close(self):
+        self.end_episode()
+        self.data.close()
+        self.chunk_log.close()
+        self.episode_log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TrajectoryStore:
+    '''
+    Random access reader for a trajectory store.
+
+    `episode`, `time_slice` and `query` return views into the memory-mapped data,
+    `replay` yields visualizer keyword arguments paced at any speed.
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.data, self.schema = open_telemetry(os.path.join(path, DATA_FILE))
+        self.channels = self.schema["channels"]
+        self.dt = self.schema["metadata"].get("dt", 1.0)
+
+        self.episodes = np.load(os.path.join(path, EPISODES_FILE), mmap_mode="r")
+        self.chunks = np.load(os.path.join(path, CHUNKS_FILE), mmap_mode="r")
+        self.episode_rows = {int(e[0]): i for i, e in enumerate(self.episodes)}
+
+    def __len__(self):
+        return len(self.episodes)
+
+    @property
+    def episode_ids(self):
+        return self.episodes[:, 0]
+
+    def channel_index(self, channels):
+        if channels is None:
+            return None
+        if isinstance(channels, str):
+            return self.channels.index(channels)
+        return [self.channels.index(c) for c in channels]
+
+    def _select(self, rows, channels):
+        idx = self.channel_index(channels)
+        if idx is None:
+            return rows
+        return rows[:, idx]
+
+    def episode_bounds(self, episode_id):
+        if episode_id not in self.episode_rows:
+            raise KeyError(f"Episode {episode_id} not in store {self.path}")
+        _, start, stop = self.episodes[self.episode_rows[episode_id]]
+        return int(start), int(stop)
+
+    def episode(self, episode_id, channels=None):
+        ''' (steps, channels) samples of one episode'''
+        start, stop = self.episode_bounds(episode_id)
+        return self._select(self.data[start:stop], channels)
+
+    def time_slice(self, t_start, t_stop, episode=None, channels=None):
+        ''' Samples with t_start <= t < t_stop, relative to the episode start or to the whole log'''
+        start, stop = (0, len(self.data)) if episode is None else self.episode_bounds(episode)
+        first = start + max(0, int(np.ceil(t_start / self.dt - 1e-9)))
+        last = start + max(0, int(np.ceil(t_stop / self.dt - 1e-9)))
+        return self._select(self.data[min(first, stop):min(last, stop)], channels)
+
+    def as_lv(self, episode):
+        ''' Episode in the (channels, steps) layout plot_graph takes'''
+        if self.channels == PLOT_CHANNELS:
+            return self.episode(episode).T
+        return self.episode(episode, PLOT_CHANNELS).T
+
+    def candidate_chunks(self, channel, low, high):
+        ''' Chunks whose min/max summary overlaps [low, high]'''
+        c = self.channel_index(channel)
+        num = len(self.channels)
+        mins = self.chunks[:, 2 + c]
+        maxs = self.chunks[:, 2 + num + c]
+        return np.flatnonzero((maxs >= low) & (mins <= high))
+
+    def query(self, channel, low, high, episode=None):
+        ''' Row numbers where low <= channel <= high, only scanning chunks that can match'''
+        c = self.channel_index(channel)
+        start, stop = (0, len(self.data)) if episode is None else self.episode_bounds(episode)
+
+        rows = []
+        summarized = 0
+        for k in self.candidate_chunks(channel, low, high):
+            first, end = int(self.chunks[k, 0]), int(self.chunks[k, 1])
+            first, end = max(first, start), min(end, stop)
+            if first < end:
+                values = self.data[first:end, c]
+                rows.append(first + np.flatnonzero((values >= low) & (values <= high)))
+        if len(self.chunks):
+            summarized = int(self.chunks[-1, 1])
+
+        ''' Rows written after the last summary'''
+        if summarized < stop:
+            first = max(summarized, start)
+            values = self.data[first:stop, c]
+            rows.append(first + np.flatnonzero((values >= low) & (values <= high)))
+
+        if not rows:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(rows)
+
+    def replay(self, episode=None, speed=1.0, t_start=0.0, t_stop=None,
+               channels=("cart_pos", "pole_angle", "cart_vel", "pole_vel")):
+        '''
+        Yield keyword arguments for RealtimeCartPoleVisualizer.update.
+
+        Samples are picked from the wall clock, so the replay runs at `speed` times
+        real time whatever the frame rate of the consumer, skipping samples when it
+        falls behind. speed=None yields every sample without waiting.
+        '''
+        start, stop = (0, len(self.data)) if episode is None else self.episode_bounds(episode)
+        if t_stop is not None:
+            stop = min(stop, start + int(np.ceil(t_stop / self.dt)))
+        start = min(stop, start + int(np.ceil(t_start / self.dt)))
+        idx = self.channel_index(list(channels))
+        names = ("cart_position", "pole_angle", "cart_velocity", "pole_velocity")
+
+        def sample(row):
+            values = self.data[row, idx]
+            return dict(zip(names, (float(v) for v in values)))
+
+        if speed is None:
+            for row in range(start, stop):
+                yield sample(row)
+            return
+
+        wall_start = time.perf_counter()
+        last = -1
+        while True:
+            row = start + int((time.perf_counter() - wall_start) * speed / self.dt)
+            if row >= stop:
+                break
+            if row == last:
+                time.sleep(min(self.dt / speed, 0.005))
+                continue
+            last = row
+            yield sample(row)
+
+
+if __name__ == "__main__":
+    import argparse
+    from visualize import RealtimeCartPoleVisualizer
+
+    parser = argparse.ArgumentParser(description="Replay a trajectory store in the visualizer")
+    parser.add_argument("path")
+    parser.add_argument("--episode", type=int, default=None)
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--start", type=float, default=0.0, help="Start time in seconds")
+    args = parser.parse_args()
+
+    store = TrajectoryStore(args.path)
+    pole_length = store.schema["metadata"].get("pole_length", 1.0)
+    visualizer = RealtimeCartPoleVisualizer(pole_length_meters=pole_length)
+    for frame in store.replay(args.episode, args.speed, args.start):
+        if not visualizer.update(**frame):
+            break
+    visualizer.close()
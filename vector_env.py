@@ -0,0 +1,83 @@
+import math
+import numpy as np
+
+from cartpole import cartople, wrap_angle
+from rk4 import rk4
+
+
+class CartPoleVectorEnv:
+    '''
+    N cart-pole environments stepped together.
+
+    States are held in one contiguous (N, 4) array in the same order the plant
+    uses : x_dot, x, w_dot, w. Finished environments are reset automatically, the
+    observation they reached before the reset is kept in `final_observation`.
+    dtype sets the precision of the states and of the integration.
+    '''
+    def __init__(self, num_envs, dt=0.05, cart_mass=1, pole_mass=0.1, pole_length=1,
+                 theta_limit=math.radians(12), x_limit=5.0, max_steps=500, init_range=0.05, g=9.8, dtype=np.float64):
+        self.num_envs = num_envs
+        self.dt = dt
+        self.g = g
+        self.theta_limit = theta_limit
+        self.x_limit = x_limit
+        self.max_steps = max_steps
+        self.init_range = init_range
+
+        self.dtype = np.dtype(dtype)
+        self.plant = cartople(cart_mass, pole_mass, pole_length, dtype=self.dtype)
+
+        self.states = np.zeros((num_envs, 4), dtype=self.dtype)
+        self.final_observation = np.zeros((num_envs, 4), dtype=self.dtype)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int64)
+        self.rewards = np.zeros(num_envs, dtype=float)
+        self.dones = np.zeros(num_envs, dtype=bool)
+
+        self.rng = np.random.default_rng()
+
+    def _sample_states(self, n):
+        return self.rng.uniform(-self.init_range, self.init_range, size=(n, 4))
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+
+        self.states[:] = self._sample_states(self.num_envs)
+        self.episode_steps[:] = 0
+        self.dones[:] = False
+        return self.states.copy()
+
+    def step(self, actions):
+        force = np.broadcast_to(np.asarray(actions, dtype=self.dtype), (self.num_envs,))
+
+        fn = lambda y : self.plant.batch(y, force, self.g)
+        self.states[:] = rk4(fn, self.states, self.dt)
+        self.states[:, 3] = wrap_angle(self.states[:, 3])
+        self.episode_steps += 1
+
+        ''' Pole fell, cart left the track or the episode ran out of time'''
+        np.greater(np.abs(self.states[:, 3]), self.theta_limit, out=self.dones)
+        self.dones |= np.abs(self.states[:, 1]) > self.x_limit
+        self.dones |= self.episode_steps >= self.max_steps
+        self.rewards[:] = 1.0
+
+        ''' Auto reset'''
+        done_idx = np.flatnonzero(self.dones)
+        if done_idx.size:
+            self.final_observation[done_idx] = self.states[done_idx]
+            self.states[done_idx] = self._sample_states(done_idx.size)
+            self.episode_steps[done_idx] = 0
+
+        return self.states.copy(), self.rewards.copy(), self.dones.copy()
+
+
+if __name__ == "__main__":
+    env = CartPoleVectorEnv(1024)
+    obs = env.reset(seed=0)
+    episodes = 0
+    for _ in range(1000):
+        ''' Simple linear policy on the pole angle and angular velocity'''
+        actions = 20.0 * obs[:, 3] + 3.0 * obs[:, 2]
+        obs, reward, done = env.step(actions)
+        episodes += int(done.sum())
+    print(f"Finished episodes: {episodes}")
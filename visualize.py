@@ -3,15 +3,119 @@ import numpy as np
 import math
 import time
 import os
-from collections import deque
+from collections import OrderedDict
+
+from assets import load_layers, default_cache_dir
+
+class TextCache:
+    """Rendered text surfaces keyed by font, string and colour; least recently used dropped first"""
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+    
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self.surfaces[key] = surface
+            if len(self.surfaces) > self.max_entries:
+                self.surfaces.popitem(last=False)
+        else:
+            self.surfaces.move_to_end(key)
+        return surface
+
+class TrailBuffer:
+    """Preallocated ring buffer of cart positions, oldest first through view()"""
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Every sample is written twice so the latest `size` samples are always one contiguous slice
+        self.data = np.zeros(2 * capacity, dtype=float)
+        self.count = 0
+    
+    def append(self, x):
+        idx = self.count % self.capacity
+        self.data[idx] = x
+        self.data[idx + self.capacity] = x
+        self.count += 1
+    
+    def clear(self):
+        self.count = 0
+    
+    def __len__(self):
+        return min(self.count, self.capacity)
+    
+    def view(self):
+        end = (self.count - 1) % self.capacity + 1 + self.capacity
+        return self.data[end - len(self):end]
+
+class FrameBudget:
+    """Rolling per-stage draw times and the decorative quality level they leave room for"""
+    FULL = 0          # everything drawn live
+    CACHED = 1        # stars from a precomputed sprite table, trail always decimated
+    MINIMAL = 2       # stars and trail dropped
+    
+    def __init__(self, target_frame_time, window=30, degrade_ratio=0.9, recover_ratio=0.5):
+        self.target_frame_time = target_frame_time
+        self.window = window
+        self.degrade_ratio = degrade_ratio
+        self.recover_ratio = recover_ratio
+        self.level = self.FULL
+        self.stage_times = {}
+        self.frame_times = np.zeros(window)
+        self.frames = 0
+        self.frames_at_level = 0
+        self.last_mark = None
+        self.frame_start = None
+    
+    def start_frame(self):
+        self.frame_start = self.last_mark = time.perf_counter()
+    
+    def mark(self, stage):
+        now = time.perf_counter()
+        times = self.stage_times.get(stage)
+        if times is None:
+            times = self.stage_times[stage] = np.zeros(self.window)
+        times[self.frames % self.window] = now - self.last_mark
+        self.last_mark = now
+    
+    def end_frame(self):
+        self.frame_times[self.frames % self.window] = time.perf_counter() - self.frame_start
+        self.frames += 1
+        self.frames_at_level += 1
+        
+        # Only move one level per full window, so a single slow frame does not flip it
+        if self.frames_at_level < self.window:
+            return self.level
+        average = self.frame_times.mean()
+        if average > self.degrade_ratio * self.target_frame_time and self.level < self.MINIMAL:
+            self.level += 1
+            self.frames_at_level = 0
+        elif average < self.recover_ratio * self.target_frame_time and self.level > self.FULL:
+            self.level -= 1
+            self.frames_at_level = 0
+        return self.level
+    
+    def summary(self):
+        """Mean time per stage over the window, in milliseconds"""
+        return {stage: 1000.0 * float(times.mean()) for stage, times in self.stage_times.items()}
 
 class RealtimeCartPoleVisualizer:
-    def __init__(self, width=800, height=600, pole_length_meters=2.0, cart_width_meters=1.0, cart_height_meters=0.5, background_path=None):
+    def __init__(self, width=800, height=600, pole_length_meters=2.0, cart_width_meters=1.0, cart_height_meters=0.5, background_path=None, asset_cache_dir=None, dirty_rects=False, headless=False, trail_length=200, trail_decimate=True, adaptive_quality=True, fps=60):
+        # Headless: render offscreen under the SDL dummy driver, without frame pacing
+        self.headless = headless
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
         pygame.init()
         self.width = width
         self.height = height
-        self.screen = pygame.display.set_mode((width, height))
-        pygame.display.set_caption("Real-time CartPole Visualizer")
+        if headless:
+            # A tiny display only provides the pixel format surfaces are converted to
+            pygame.display.set_mode((1, 1))
+            self.screen = pygame.Surface((width, height)).convert()
+        else:
+            self.screen = pygame.display.set_mode((width, height))
+            pygame.display.set_caption("Real-time CartPole Visualizer")
         
         # Day/Night toggle
         self.is_night = False
@@ -52,9 +156,16 @@ class RealtimeCartPoleVisualizer:
         
         # Animation settings
         self.clock = pygame.time.Clock()
-        self.fps = 60
+        self.fps = fps
+        
+        # Decorative layers are cached or dropped when the draw stages overrun the frame budget
+        self.adaptive_quality = adaptive_quality and not headless
+        self.frame_budget = FrameBudget(1.0 / self.fps)
+        self.star_phase_steps = 64
+        self.star_sprites = None
         
-        # Load background images (including ground)
+        # Load background images (including ground), asset_cache_dir=False disables the disk cache
+        self.asset_cache_dir = default_cache_dir() if asset_cache_dir is None else (asset_cache_dir or None)
         self.background_images = self.load_background_images(background_path)
         
         # Sun/Moon settings
@@ -69,14 +180,31 @@ class RealtimeCartPoleVisualizer:
             star_x = np.random.randint(0, self.width)
             star_y = np.random.randint(0, self.height // 2)
             self.stars.append((star_x, star_y))
+        self.visible_stars = list(enumerate(self.stars))
+        
+        # Dirty-rectangle mode: restore and push only the regions dynamic elements covered
+        self.dirty_rects = dirty_rects
+        self.frame_rects = []
+        self.previous_rects = []
+        # Screen regions changed since the last present, None when the whole screen was redrawn
+        self.unpresented_rects = []
+        
+        # Static layers (sky, scenery, sun/moon, ground, track) composited per day/night mode
+        self.background_cache = None
+        self.background_cache_key = None
         
         # State tracking
         self.start_time = time.time()
         self.frame_count = 0
+        # Drawing time of the last frame without frame pacing, and optional overlay text (see set_overlay)
+        self.draw_time_ns = 0
+        self.overlay_lines = None
+        self.overlay_font = pygame.font.Font(None, 20)
         self.should_close = False
         
         # Trajectory
-        self.position_history = deque(maxlen=200)
+        self.position_history = TrailBuffer(trail_length)
+        self.trail_decimate = trail_decimate
         self.show_trajectory = False
         
         # Target position slider
@@ -99,68 +227,47 @@ class RealtimeCartPoleVisualizer:
         self.tab_height = 80
         self.tab_font = pygame.font.Font(None, 24)
         self.tab_title_font = pygame.font.Font(None, 20)
+        self.target_font = pygame.font.Font(None, 24)
+        
+        # Text is only rendered when a string is new, the tab background once per theme
+        self.text_cache = TextCache()
+        self.tab_background = None
+        self.tab_background_key = None
     
     def load_background_images(self, background_path):
         """Load and scale background images including ground"""
-        images = {
-            'sky': None,
-            'mountains': None,
-            'trees_back': None,
-            'trees_front': None,
-            'ground': None  # New ground image layer
-        }
-        
         if background_path is None:
             # Use default path structure
             base_path = os.path.join(os.path.dirname(__file__), "Images", "background")
         else:
             base_path = background_path
         
+        def fit_width(size):
+            scale_factor = self.width / size[0]
+            return (self.width, int(size[1] * scale_factor))
+        
+        def ground_size(size):
+            return (self.width, self.height - self.ground_y + 50)  # Extend below the ground line
+        
+        layers = {
+            'sky': (os.path.join(base_path, "sky_cloud.png"), lambda size: None),
+            'mountains': (os.path.join(base_path, "mountain.png"), fit_width),
+            'trees_back': (os.path.join(base_path, "pine1.png"), fit_width),
+            'trees_front': (os.path.join(base_path, "pine2.png"), fit_width),
+            'ground': (os.path.join(base_path, "ground.png"), ground_size)
+        }
+        
         try:
-            # Load each background layer
-            sky_path = os.path.join(base_path, "sky_cloud.png")
-            mountain_path = os.path.join(base_path, "mountain.png")
-            trees_back_path = os.path.join(base_path, "pine1.png")
-            trees_front_path = os.path.join(base_path, "pine2.png")
-            ground_path = os.path.join(base_path, "ground.png")  # New ground image
-            
-            if os.path.exists(sky_path):
-                images['sky'] = pygame.image.load(sky_path)
-               
-            
-            if os.path.exists(mountain_path):
-                images['mountains'] = pygame.image.load(mountain_path)
-                original_size = images['mountains'].get_size()
-                scale_factor = self.width / original_size[0]
-                new_height = int(original_size[1] * scale_factor)
-                images['mountains'] = pygame.transform.scale(images['mountains'], (self.width, new_height))
-            
-            if os.path.exists(trees_back_path):
-                images['trees_back'] = pygame.image.load(trees_back_path)
-                original_size = images['trees_back'].get_size()
-                scale_factor = self.width / original_size[0]
-                new_height = int(original_size[1] * scale_factor)
-                images['trees_back'] = pygame.transform.scale(images['trees_back'], (self.width, new_height))
-            
-            if os.path.exists(trees_front_path):
-                images['trees_front'] = pygame.image.load(trees_front_path)
-                original_size = images['trees_front'].get_size()
-                scale_factor = self.width / original_size[0]
-                new_height = int(original_size[1] * scale_factor)
-                images['trees_front'] = pygame.transform.scale(images['trees_front'], (self.width, new_height))
-            
-            # Load ground image
-            if os.path.exists(ground_path):
-                images['ground'] = pygame.image.load(ground_path)
-                ground_height = self.height - self.ground_y + 50  # Extend below the ground line
-                images['ground'] = pygame.transform.scale(images['ground'], (self.width, ground_height))
-            else:
-                print(f"Ground image not found at: {ground_path}")
-                print("Available alternative names to try: terrain.png, soil.png, grass.png, earth.png")
-                
+            # Decoded and scaled in parallel, cached on disk per window size, converted to the display format
+            images = load_layers(layers, self.asset_cache_dir, (self.width, self.height, self.ground_y))
         except pygame.error as e:
             print(f"Error loading background images: {e}")
             print("Falling back to programmatic backgrounds")
+            images = {name: None for name in layers}
+        
+        if images['ground'] is None:
+            print(f"Ground image not found at: {layers['ground'][0]}")
+            print("Available alternative names to try: terrain.png, soil.png, grass.png, earth.png")
         
         return images
     
@@ -223,16 +330,25 @@ class RealtimeCartPoleVisualizer:
                     self.set_target_from_mouse_x(mouse_x)
         return True
     
-    def draw_stars(self):
+    def draw_stars(self, surface=None, visible_only=False):
+        surface = self.screen if surface is None else surface
         current_time = time.time()
-        for i, (star_x, star_y) in enumerate(self.stars):
+        stars = self.visible_stars if visible_only else enumerate(self.stars)
+        for i, (star_x, star_y) in stars:
             twinkle_phase = (current_time * 2 + i) % (2 * math.pi)
             brightness = int(200 + 55 * math.sin(twinkle_phase))
             star_color = (brightness, brightness, brightness)
             star_size = 1 + int(0.5 * math.sin(twinkle_phase + i))
-            pygame.draw.circle(self.screen, star_color, (star_x, star_y), star_size)
+            self.frame_rects.append(pygame.draw.circle(surface, star_color, (star_x, star_y), star_size))
     
-    def draw_background(self):
+    def draw_background(self, surface=None, stars=True):
+        surface = self.screen if surface is None else surface
+        self.draw_sky(surface)
+        if self.is_night and stars:
+            self.draw_stars(surface)
+        self.draw_scenery(surface)
+    
+    def draw_sky(self, surface):
         if self.is_night:
             # Night mode - use darker overlay
             if self.background_images['sky']:
@@ -242,52 +358,49 @@ class RealtimeCartPoleVisualizer:
                 dark_overlay.fill((0, 0, 50))
                 dark_overlay.set_alpha(180)
                 night_sky.blit(dark_overlay, (0, 0))
-                self.screen.blit(night_sky, (0, 0))
+                surface.blit(night_sky, (0, 0))
             else:
-                self.screen.fill(self.NIGHT_SKY)
-            
-            # Draw stars
-            self.draw_stars()
-            
+                surface.fill(self.NIGHT_SKY)
+        else:
+            # Day mode
+            if self.background_images['sky']:
+                surface.blit(self.background_images['sky'], (0, 0))
+            else:
+                surface.fill(self.LIGHT_BLUE)
+    
+    def draw_scenery(self, surface):
+        if self.is_night:
             # Draw background layers with night tint
             if self.background_images['mountains']:
-                night_mountains = self.background_images['mountains'].copy()
                 mountain_y = 240
-                self.screen.blit(night_mountains, (0, mountain_y))
+                surface.blit(self.background_images['mountains'], (0, mountain_y))
             
             if self.background_images['trees_back']:
-                night_trees_back = self.background_images['trees_back'].copy()
                 trees_back_y = 280
-                self.screen.blit(night_trees_back, (0, trees_back_y))
+                surface.blit(self.background_images['trees_back'], (0, trees_back_y))
             
             # Draw moon
-            pygame.draw.circle(self.screen, self.MOON_COLOR, (self.celestial_x, self.celestial_y), self.celestial_radius)
-            pygame.draw.circle(self.screen, (220, 220, 200), (self.celestial_x, self.celestial_y), self.celestial_radius - 8)
+            pygame.draw.circle(surface, self.MOON_COLOR, (self.celestial_x, self.celestial_y), self.celestial_radius)
+            pygame.draw.circle(surface, (220, 220, 200), (self.celestial_x, self.celestial_y), self.celestial_radius - 8)
             
             # Moon craters
-            pygame.draw.circle(self.screen, (200, 200, 180), (self.celestial_x - 8, self.celestial_y - 5), 4)
-            pygame.draw.circle(self.screen, (200, 200, 180), (self.celestial_x + 6, self.celestial_y + 8), 3)
-            pygame.draw.circle(self.screen, (200, 200, 180), (self.celestial_x + 3, self.celestial_y - 10), 2)
+            pygame.draw.circle(surface, (200, 200, 180), (self.celestial_x - 8, self.celestial_y - 5), 4)
+            pygame.draw.circle(surface, (200, 200, 180), (self.celestial_x + 6, self.celestial_y + 8), 3)
+            pygame.draw.circle(surface, (200, 200, 180), (self.celestial_x + 3, self.celestial_y - 10), 2)
             
         else:
-            # Day mode
-            if self.background_images['sky']:
-                self.screen.blit(self.background_images['sky'], (0, 0))
-            else:
-                self.screen.fill(self.LIGHT_BLUE)
-            
             # Draw background layers
             if self.background_images['mountains']:
                 mountain_y = 240
-                self.screen.blit(self.background_images['mountains'], (0, mountain_y))
+                surface.blit(self.background_images['mountains'], (0, mountain_y))
             
             if self.background_images['trees_back']:
                 trees_back_y = 280
-                self.screen.blit(self.background_images['trees_back'], (0, trees_back_y))
+                surface.blit(self.background_images['trees_back'], (0, trees_back_y))
             
             # Draw sun
-            pygame.draw.circle(self.screen, self.YELLOW, (self.celestial_x, self.celestial_y), self.celestial_radius)
-            pygame.draw.circle(self.screen, (255, 255, 150), (self.celestial_x, self.celestial_y), 25)
+            pygame.draw.circle(surface, self.YELLOW, (self.celestial_x, self.celestial_y), self.celestial_radius)
+            pygame.draw.circle(surface, (255, 255, 150), (self.celestial_x, self.celestial_y), 25)
             
             # Sun rays
             for i in range(8):
@@ -296,18 +409,57 @@ class RealtimeCartPoleVisualizer:
                 ray_start_y = self.celestial_y + 45 * math.sin(angle)
                 ray_end_x = self.celestial_x + 60 * math.cos(angle)
                 ray_end_y = self.celestial_y + 60 * math.sin(angle)
-                pygame.draw.line(self.screen, self.YELLOW, 
+                pygame.draw.line(surface, self.YELLOW, 
                                (ray_start_x, ray_start_y), (ray_end_x, ray_end_y), 3)
         
         # Draw front trees last (closest to viewer)
         if self.background_images['trees_front']:
-            if self.is_night:
-                night_trees_front = self.background_images['trees_front'].copy()
-                trees_front_y = self.ground_y - night_trees_front.get_height() + 40
-                self.screen.blit(night_trees_front, (0, trees_front_y))
-            else:
-                trees_front_y = self.ground_y - self.background_images['trees_front'].get_height() + 40
-                self.screen.blit(self.background_images['trees_front'], (0, trees_front_y))
+            trees_front_y = self.ground_y - self.background_images['trees_front'].get_height() + 40
+            surface.blit(self.background_images['trees_front'], (0, trees_front_y))
+    
+    def build_star_sprites(self):
+        """Star sprites for the twinkle phase quantised into star_phase_steps buckets"""
+        self.star_sprites = []
+        for k in range(self.star_phase_steps):
+            brightness = int(200 + 55 * math.sin(2 * math.pi * k / self.star_phase_steps))
+            sprite = pygame.Surface((3, 3))
+            sprite.set_colorkey(self.BLACK)
+            pygame.draw.circle(sprite, (brightness, brightness, brightness), (1, 1), 1)
+            self.star_sprites.append(sprite.convert(self.screen))
+    
+    def draw_stars_cached(self):
+        """draw_stars from the sprite table: one vectorised phase lookup and one blits call"""
+        if self.star_sprites is None:
+            self.build_star_sprites()
+        if not self.visible_stars:
+            return
+        index = np.array([i for i, _ in self.visible_stars], dtype=float)
+        corners = [(x - 1, y - 1) for _, (x, y) in self.visible_stars]
+        phase = np.mod(time.time() * 2 + index, 2 * math.pi)
+        steps = (phase * (self.star_phase_steps / (2 * math.pi))).astype(np.int64) % self.star_phase_steps
+        sprites = [self.star_sprites[k] for k in steps.tolist()]
+        self.frame_rects.extend(self.screen.blits(list(zip(sprites, corners))))
+    
+    def get_background_cache(self):
+        """Static layers composited once per day/night mode and window size"""
+        key = (self.is_night, self.screen.get_size())
+        if self.background_cache_key != key:
+            self.background_cache = self.build_background_cache()
+            self.background_cache_key = key
+        return self.background_cache
+    
+    def build_background_cache(self):
+        cache = pygame.Surface(self.screen.get_size()).convert(self.screen)
+        self.draw_sky(cache)
+        
+        # Stars twinkle so they stay dynamic; keep only those not hidden by the scenery
+        sky_colors = [cache.get_at(star) for star in self.stars]
+        self.draw_scenery(cache)
+        self.draw_ground(cache)
+        self.draw_slider_track(cache)
+        self.visible_stars = [(i, star) for i, star in enumerate(self.stars)
+                              if cache.get_at(star) == sky_colors[i]]
+        return cache
     
     def draw_cart(self, x_pos):
         screen_x = self.world_to_screen(x_pos)
@@ -319,7 +471,7 @@ class RealtimeCartPoleVisualizer:
             self.cart_width,
             self.cart_height
         )
-        pygame.draw.rect(self.screen, cart_color, cart_rect)
+        self.frame_rects.append(pygame.draw.rect(self.screen, cart_color, cart_rect))
         pygame.draw.rect(self.screen, self.BLACK, cart_rect, 2)
         
         return screen_x, self.ground_y - self.cart_height // 2
@@ -330,9 +482,9 @@ class RealtimeCartPoleVisualizer:
         
         # Draw pole as a thick yellow line
         pole_color = (255, 255, 0)  # Bright yellow
-        pygame.draw.line(self.screen, pole_color,
+        self.frame_rects.append(pygame.draw.line(self.screen, pole_color,
                         (cart_x, cart_y), (pole_end_x, pole_end_y), 
-                        self.pole_width)
+                        self.pole_width))
         
         # Draw black outline for the pole
         pygame.draw.line(self.screen, self.BLACK,
@@ -340,10 +492,11 @@ class RealtimeCartPoleVisualizer:
         
         # Draw joint at cart connection point
         joint_radius = 8
-        pygame.draw.circle(self.screen, self.BLACK, (int(cart_x), int(cart_y)), joint_radius)
+        self.frame_rects.append(pygame.draw.circle(self.screen, self.BLACK, (int(cart_x), int(cart_y)), joint_radius))
         pygame.draw.circle(self.screen, self.GRAY, (int(cart_x), int(cart_y)), joint_radius - 2)
     
-    def draw_ground(self):
+    def draw_ground(self, surface=None):
+        surface = self.screen if surface is None else surface
         # Draw ground image if available, otherwise fallback to simple ground
         if self.background_images['ground']:
             ground_y_pos = self.ground_y - 20  # Position ground image slightly above the ground line
@@ -355,45 +508,50 @@ class RealtimeCartPoleVisualizer:
                 dark_overlay.fill((0, 0, 30))
                 dark_overlay.set_alpha(120)
                 night_ground.blit(dark_overlay, (0, 0))
-                self.screen.blit(night_ground, (0, ground_y_pos))
+                surface.blit(night_ground, (0, ground_y_pos))
             else:
-                self.screen.blit(self.background_images['ground'], (0, ground_y_pos))
+                surface.blit(self.background_images['ground'], (0, ground_y_pos))
         else:
             # Fallback to programmatic ground
             # Draw ground with grass texture
             ground_color = self.NIGHT_GRASS if self.is_night else self.DARK_GREEN
             ground_rect = pygame.Rect(0, self.ground_y, self.width, self.height - self.ground_y)
-            pygame.draw.rect(self.screen, ground_color, ground_rect)
+            pygame.draw.rect(surface, ground_color, ground_rect)
             
             # Add some underground brown layer
             underground_color = (80, 40, 20) if self.is_night else self.BROWN
             underground_rect = pygame.Rect(0, self.ground_y + 30, self.width, self.height - self.ground_y - 30)
-            pygame.draw.rect(self.screen, underground_color, underground_rect)
+            pygame.draw.rect(surface, underground_color, underground_rect)
             
             # Add some texture to the ground
             for i in range(0, self.width, 20):
                 grass_height = np.random.randint(5, 15)
                 grass_color = (0, max(0, 100 + np.random.randint(-20, 20)), 0) if self.is_night else (0, max(0, 150 + np.random.randint(-30, 30)), 0)
-                pygame.draw.line(self.screen, grass_color,
+                pygame.draw.line(surface, grass_color,
                                (i, self.ground_y), (i, self.ground_y - grass_height), 2)
         
         # Always draw the track line on top of ground
         track_color = (100, 100, 100) if self.is_night else self.DARK_GRAY
-        pygame.draw.line(self.screen, track_color, 
+        pygame.draw.line(surface, track_color, 
                         (0, self.ground_y), 
                         (self.width, self.ground_y), 4)
         
         # Draw center reference line
         center_x = self.width // 2
         center_color = (255, 255, 100) if self.is_night else (255, 255, 0)
-        pygame.draw.line(self.screen, center_color, 
+        pygame.draw.line(surface, center_color, 
                         (center_x, self.ground_y - 8), (center_x, self.ground_y + 8), 3)
     
     def draw_target_slider(self):
+        self.draw_slider_track()
+        self.draw_slider_knob()
+    
+    def draw_slider_track(self, surface=None):
+        surface = self.screen if surface is None else surface
         track_color = (80, 80, 80) if self.is_night else (60, 60, 60)
         track_rect = pygame.Rect(self.slider_x, self.slider_y, self.slider_width, self.slider_height)
-        pygame.draw.rect(self.screen, track_color, track_rect)
-        pygame.draw.rect(self.screen, self.BLACK, track_rect, 2)
+        pygame.draw.rect(surface, track_color, track_rect)
+        pygame.draw.rect(surface, self.BLACK, track_rect, 2)
         
         marking_color = (200, 200, 200) if self.is_night else self.WHITE
         font = pygame.font.Font(None, 20)
@@ -402,7 +560,7 @@ class RealtimeCartPoleVisualizer:
             normalized = (pos - self.slider_min_pos) / (self.slider_max_pos - self.slider_min_pos)
             mark_x = self.slider_x + normalized * self.slider_width
             
-            pygame.draw.line(self.screen, marking_color, 
+            pygame.draw.line(surface, marking_color, 
                            (mark_x, self.slider_y - 5), (mark_x, self.slider_y + self.slider_height + 5), 1)
             
             if abs(pos) < 0.01:
@@ -416,14 +574,15 @@ class RealtimeCartPoleVisualizer:
             label_rect = label.get_rect()
             label_rect.centerx = mark_x
             label_rect.y = self.slider_y + self.slider_height + 8
-            self.screen.blit(label, label_rect)
+            surface.blit(label, label_rect)
         
+    def draw_slider_knob(self):
         target_screen_x = self.world_to_screen(self.target_position)
         if 0 <= target_screen_x <= self.width:
             target_color = self.ORANGE
-            pygame.draw.line(self.screen, target_color,
+            self.frame_rects.append(pygame.draw.line(self.screen, target_color,
                            (target_screen_x, self.ground_y - 15),
-                           (target_screen_x, self.ground_y + 5), 4)
+                           (target_screen_x, self.ground_y + 5), 4))
             
             triangle_points = [
                 (target_screen_x, self.ground_y - 25),
@@ -431,10 +590,9 @@ class RealtimeCartPoleVisualizer:
                 (target_screen_x + 8, self.ground_y - 15)
             ]
             pygame.draw.polygon(self.screen, target_color, triangle_points)
-            pygame.draw.polygon(self.screen, self.BLACK, triangle_points, 2)
+            self.frame_rects.append(pygame.draw.polygon(self.screen, self.BLACK, triangle_points, 2))
             
-            target_font = pygame.font.Font(None, 24)
-            target_text = target_font.render(f"Target: {self.target_position:.2f}m", True, target_color)
+            target_text = self.text_cache.render(self.target_font, f"Target: {self.target_position:.2f}m", target_color)
             target_rect = target_text.get_rect()
             target_rect.centerx = target_screen_x
             target_rect.y = self.ground_y + 10
@@ -445,17 +603,17 @@ class RealtimeCartPoleVisualizer:
             bg_surface.set_alpha(200)
             bg_color = (0, 0, 50) if self.is_night else (0, 0, 0)
             bg_surface.fill(bg_color)
-            self.screen.blit(bg_surface, bg_rect)
+            self.frame_rects.append(self.screen.blit(bg_surface, bg_rect))
             self.screen.blit(target_text, target_rect)
         
         knob_x = self.get_slider_knob_x()
         knob_y = self.slider_y + self.slider_height // 2
         
         shadow_color = (30, 30, 30) if self.is_night else (100, 100, 100)
-        pygame.draw.circle(self.screen, shadow_color, (knob_x + 2, knob_y + 2), self.slider_knob_radius)
+        self.frame_rects.append(pygame.draw.circle(self.screen, shadow_color, (knob_x + 2, knob_y + 2), self.slider_knob_radius))
         
         knob_color = (150, 200, 255) if self.is_night else (100, 150, 255)
-        pygame.draw.circle(self.screen, knob_color, (knob_x, knob_y), self.slider_knob_radius)
+        self.frame_rects.append(pygame.draw.circle(self.screen, knob_color, (knob_x, knob_y), self.slider_knob_radius))
         pygame.draw.circle(self.screen, self.BLACK, (knob_x, knob_y), self.slider_knob_radius, 2)
         
         highlight_color = (200, 220, 255) if self.is_night else (150, 200, 255)
@@ -464,22 +622,38 @@ class RealtimeCartPoleVisualizer:
     def draw_trajectory(self):
         if self.show_trajectory and len(self.position_history) > 1:
             trail_color = (255, 255, 100) if self.is_night else (255, 0, 0)
-            points = []
-            for i, pos in enumerate(self.position_history):
-                screen_x = self.world_to_screen(pos)
-                if 0 <= screen_x <= self.width:
-                    points.append((screen_x, self.ground_y - 20))
+            # Whole trail projected at once
+            screen_x = self.world_to_screen(self.position_history.view())
+            screen_x = screen_x[(screen_x >= 0) & (screen_x <= self.width)]
+            
+            if self.trail_decimate and len(screen_x) > 1:
+                # One point per pixel column run, which keeps the shape of the path
+                columns = screen_x.astype(np.int64)
+                keep = np.empty(len(columns), dtype=bool)
+                keep[0] = True
+                np.not_equal(columns[1:], columns[:-1], out=keep[1:])
+                keep[-1] = True
+                screen_x = screen_x[keep]
             
-            if len(points) > 1:
-                pygame.draw.lines(self.screen, trail_color, False, points, 2)
+            if len(screen_x) > 1:
+                points = np.empty((len(screen_x), 2))
+                points[:, 0] = screen_x
+                points[:, 1] = self.ground_y - 20
+                self.frame_rects.append(pygame.draw.lines(self.screen, trail_color, False, points.tolist(), 2))
+    
+    def get_tab_background(self):
+        key = (self.is_night, self.width)
+        if self.tab_background_key != key:
+            tab_bg_color = (0, 0, 50) if self.is_night else (240, 240, 240)
+            self.tab_background = pygame.Surface((self.width, self.tab_height)).convert(self.screen)
+            self.tab_background.set_alpha(220)
+            self.tab_background.fill(tab_bg_color)
+            self.tab_background_key = key
+        return self.tab_background
     
     def draw_top_tabs(self, current_time, cart_pos, pole_angle, cart_velocity=None, pole_velocity=None):
         # Background for tabs
-        tab_bg_color = (0, 0, 50) if self.is_night else (240, 240, 240)
-        tab_surface = pygame.Surface((self.width, self.tab_height))
-        tab_surface.set_alpha(220)
-        tab_surface.fill(tab_bg_color)
-        self.screen.blit(tab_surface, (0, 0))
+        self.frame_rects.append(self.screen.blit(self.get_tab_background(), (0, 0)))
         
         # Text colors
         text_color = (200, 200, 255) if self.is_night else (50, 50, 50)
@@ -511,45 +685,118 @@ class RealtimeCartPoleVisualizer:
             pygame.draw.rect(self.screen, text_color, tab_rect, 1)
             
             # Label
-            label_surface = self.tab_title_font.render(label, True, label_color)
+            label_surface = self.text_cache.render(self.tab_title_font, label, label_color)
             label_rect = label_surface.get_rect()
             label_rect.centerx = x_pos + tab_width // 2
             label_rect.y = 10
             self.screen.blit(label_surface, label_rect)
             
             # Value
-            value_surface = self.tab_font.render(value, True, text_color)
+            value_surface = self.text_cache.render(self.tab_font, value, text_color)
             value_rect = value_surface.get_rect()
             value_rect.centerx = x_pos + tab_width // 2
             value_rect.y = 35
             self.screen.blit(value_surface, value_rect)
     
-    def update(self, cart_position, pole_angle, cart_velocity=None, pole_velocity=None, force_redraw=True):
+    def set_overlay(self, lines):
+        """Text lines shown in a box under the tabs, None to hide it"""
+        self.overlay_lines = lines
+    
+    def draw_overlay(self):
+        text_color = (200, 255, 200) if self.is_night else (20, 60, 20)
+        surfaces = [self.text_cache.render(self.overlay_font, line, text_color) for line in self.overlay_lines]
+        line_height = self.overlay_font.get_linesize()
+        box = pygame.Rect(0, 0, max(s.get_width() for s in surfaces) + 12, line_height * len(surfaces) + 8)
+        box.topright = (self.width - 6, self.tab_height + 6)
+        
+        panel = pygame.Surface(box.size).convert(self.screen)
+        panel.fill((0, 0, 0) if self.is_night else (255, 255, 255))
+        panel.set_alpha(170)
+        self.frame_rects.append(self.screen.blit(panel, box))
+        self.screen.blits([(surface, (box.x + 6, box.y + 4 + i * line_height)) for i, surface in enumerate(surfaces)], doreturn=False)
+    
+    def update(self, cart_position, pole_angle, cart_velocity=None, pole_velocity=None, force_redraw=True, current_time=None):
         if not self.handle_events():
             return False
         
         self.position_history.append(cart_position)
         
-        current_time = time.time() - self.start_time
+        if current_time is None:
+            current_time = time.time() - self.start_time
+        
+        budget = self.frame_budget
+        quality = budget.level if self.adaptive_quality else FrameBudget.FULL
+        budget.start_frame()
+        draw_start = time.perf_counter_ns()
         
-        self.draw_background()
-        self.draw_ground()  # This now includes ground image support
-        self.draw_target_slider()
-        self.draw_trajectory()
+        # Cached static layers, then the twinkling stars left visible by the scenery
+        self.frame_rects = []
+        full_frame = not self.dirty_rects or self.background_cache_key != (self.is_night, self.screen.get_size())
+        background = self.get_background_cache()
+        if full_frame:
+            self.screen.blit(background, (0, 0))
+        else:
+            # Only restore what the previous frame drew over
+            for rect in self.previous_rects:
+                self.screen.blit(background, rect, rect)
+        budget.mark("background")
+        
+        if self.is_night:
+            if quality == FrameBudget.FULL:
+                self.draw_stars(visible_only=True)
+            elif quality == FrameBudget.CACHED:
+                self.draw_stars_cached()
+        budget.mark("stars")
+        
+        self.draw_slider_knob()
+        budget.mark("slider")
+        
+        if quality < FrameBudget.MINIMAL:
+            decimate = self.trail_decimate
+            self.trail_decimate = decimate or quality == FrameBudget.CACHED
+            self.draw_trajectory()
+            self.trail_decimate = decimate
+        budget.mark("trajectory")
         
         cart_screen_x, cart_screen_y = self.draw_cart(cart_position)
         self.draw_pole(cart_screen_x, cart_screen_y, pole_angle)
+        budget.mark("cartpole")
         
         # Draw top tabs
         self.draw_top_tabs(current_time, cart_position, pole_angle, cart_velocity, pole_velocity)
+        budget.mark("tabs")
+        
+        if self.overlay_lines:
+            self.draw_overlay()
         
-        if force_redraw:
-            pygame.display.flip()
+        # Frames drawn with force_redraw=False still changed the screen, present them with the next one
+        if full_frame:
+            self.unpresented_rects = None
+        elif self.unpresented_rects is not None and not self.headless:
+            self.unpresented_rects.extend(self.previous_rects + self.frame_rects)
+        
+        if force_redraw and not self.headless:
+            if self.unpresented_rects is None:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self.unpresented_rects)
+            self.unpresented_rects = []
+            budget.mark("present")
+            budget.end_frame()
+            self.draw_time_ns = time.perf_counter_ns() - draw_start
             self.clock.tick(self.fps)
+        else:
+            budget.end_frame()
+            self.draw_time_ns = time.perf_counter_ns() - draw_start
+        self.previous_rects = self.frame_rects
         
         self.frame_count += 1
         return True
     
+    def get_frame_bytes(self):
+        """Current frame as packed RGB bytes, row by row"""
+        return pygame.image.tobytes(self.screen, "RGB")
+    
     def get_target_position(self):
         return self.target_position
     